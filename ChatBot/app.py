@@ -1,25 +1,45 @@
-from flask import Flask, request, jsonify, send_file
-from flask_cors import CORS
-import google.generativeai as genai
+from quart import Quart, Response, g, request, jsonify, send_file
+from quart_cors import cors
+import asyncio
+import collections
+import contextlib
+import json
 import os
 import re
+import time
 from dotenv import load_dotenv
-import uuid
-import pyttsx3
+import sys
+
+from artifacts import ArtifactStore
+from conversations import ConversationStore
+from gemini_client import API_BASE, ChatModel, GeminiClient
+from response_cache import ResponseCache
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from healthgenix.metrics import CONTENT_TYPE, PROFILER, REGISTRY
+from healthgenix.speech import AudioFilePool
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
+# Initialize Quart app; served by an ASGI server, so waiting on Gemini does not hold a thread
+app = cors(Quart(__name__), allow_origin="*")
 
-# Configure Google Gemini AI
+# Configure Google Gemini AI; without a key the app still starts, but /ready reports 503
 api_key = os.getenv("GOOGLE_API_KEY")
 if not api_key:
-    raise ValueError("GOOGLE_API_KEY not found in .env file")
-
-genai.configure(api_key=api_key)
+    print("Warning: GOOGLE_API_KEY not found in .env file; chat requests will fail until it is set")
+
+# One pooled HTTP client for every bot; GEMINI_BASE_URL can point at a local fake server
+client = GeminiClient(
+    api_key,
+    base_url=os.getenv("GEMINI_BASE_URL", API_BASE),
+    max_connections=int(os.getenv("GEMINI_MAX_CONNECTIONS", "100")),
+    timeout=float(os.getenv("GEMINI_TIMEOUT", "30")),
+)
+# Upstream calls in flight per bot, and the overall time allowed for one reply
+BOT_CONCURRENCY = int(os.getenv("CHAT_BOT_CONCURRENCY", "16"))
+CHAT_TIMEOUT = float(os.getenv("CHAT_TIMEOUT", "45"))
 
 # Directory for temporary files
 TEMP_DIR = os.path.join(os.getcwd(), "temp_files")
@@ -51,162 +71,410 @@ rehabbot_instruction = (
 )
 
 # Configure generative models with optimized settings for speed
-healthgenix_model = genai.GenerativeModel(
-    model_name="gemini-1.5-flash",
-    system_instruction=healthgenix_instruction,
-    generation_config={
-        "temperature": 0.5,
-        "top_p": 0.8,
-        "top_k": 40,
-        "max_output_tokens": 300,
-        "response_mime_type": "text/plain",
-    },
-)
-
-dietbot_model = genai.GenerativeModel(
-    model_name="gemini-1.5-flash",
-    system_instruction=dietbot_instruction,
-    generation_config={
-        "temperature": 0.5,
-        "top_p": 0.8,
-        "top_k": 40,
-        "max_output_tokens": 300,
-        "response_mime_type": "text/plain",
-    },
+GENERATION_CONFIG = {
+    "temperature": 0.5,
+    "top_p": 0.8,
+    "top_k": 40,
+    "max_output_tokens": 300,
+    "response_mime_type": "text/plain",
+}
+
+healthgenix_model = ChatModel(client, "gemini-1.5-flash", healthgenix_instruction, GENERATION_CONFIG, BOT_CONCURRENCY)
+dietbot_model = ChatModel(client, "gemini-1.5-flash", dietbot_instruction, GENERATION_CONFIG, BOT_CONCURRENCY)
+rehabbot_model = ChatModel(client, "gemini-1.5-flash", rehabbot_instruction, GENERATION_CONFIG, BOT_CONCURRENCY)
+
+# Models by bot name; replace entries with a stub exposing async reply() and stream() to run without Gemini
+models = {
+    "healthgenix": healthgenix_model,
+    "dietbot": dietbot_model,
+    "rehabbot": rehabbot_model,
+}
+
+# Repeat questions are answered from memory (CHAT_CACHE_SIZE entries for CHAT_CACHE_TTL seconds)
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("CHAT_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("CHAT_CACHE_TTL", "3600")),
 )
 
-rehabbot_model = genai.GenerativeModel(
-    model_name="gemini-1.5-flash",
-    system_instruction=rehabbot_instruction,
-    generation_config={
-        "temperature": 0.5,
-        "top_p": 0.8,
-        "top_k": 40,
-        "max_output_tokens": 300,
-        "response_mime_type": "text/plain",
-    },
+def format_line(line):
+    """Formats one line of an AI response: bullet points and bold headings."""
+    line = line.strip()
+    line = re.sub(r"^\*+\s*\*\*(.+?)\*\*", r"**\1**", line)
+    line = re.sub(r"^\*+\s*(.+?)\s*\*", r"**\1**", line)
+    if re.match(r"^[-•*]\s+", line):
+        return f"- {line.lstrip('-•* ')}"
+    return line
+
+# Server-side chat sessions; older turns are summarized to stay within CHAT_TOKEN_BUDGET
+conversations = ConversationStore(
+    max_sessions=int(os.getenv("CHAT_SESSIONS", "1000")),
+    idle_ttl=float(os.getenv("CHAT_SESSION_TTL", "3600")),
+    token_budget=int(os.getenv("CHAT_TOKEN_BUDGET", "1500")),
 )
 
 def format_response(text):
     """Formats AI response with structured bullet points and bold headings."""
-    lines = text.split("\n")
-    formatted_lines = []
-
-    for line in lines:
-        line = line.strip()
-        line = re.sub(r"^\*+\s*\*\*(.+?)\*\*", r"**\1**", line)
-        line = re.sub(r"^\*+\s*(.+?)\s*\*", r"**\1**", line)
-        if re.match(r"^[-•*]\s+", line):
-            formatted_lines.append(f"- {line.lstrip('-•* ')}")
-        else:
-            formatted_lines.append(line)
-    return "\n".join(formatted_lines)
-
-def generate_audio(text):
-    """Generate audio file from text using pyttsx3 with a female voice."""
-    unique_id = str(uuid.uuid4())
-    audio_file = os.path.join(TEMP_DIR, f"audio_{unique_id}.mp3")
-    engine = pyttsx3.init()
-    
-    # Set voice to female (if available)
-    voices = engine.getProperty('voices')
-    for voice in voices:
-        if "female" in voice.name.lower() or "zira" in voice.name.lower():  # Zira is a common female voice on Windows
-            engine.setProperty('voice', voice.id)
-            break
-    
-    engine.setProperty('rate', 180)  # Faster speech rate for liveliness
-    engine.setProperty('volume', 1.0)  # Max volume
-    engine.save_to_file(text, audio_file)
-    engine.runAndWait()
-    return audio_file
+    return "\n".join(format_line(line) for line in text.split("\n"))
+
+class LineFormatter:
+    """Incremental format_response: feed streamed chunks, get back formatted complete lines."""
+
+    def __init__(self):
+        self.partial = ""
+        self.lines = []
+
+    def feed(self, chunk):
+        *complete, self.partial = (self.partial + chunk).split("\n")
+        formatted = [format_line(line) for line in complete]
+        self.lines.extend(formatted)
+        return "".join(line + "\n" for line in formatted)
+
+    def finish(self):
+        """Formats the trailing line; returns it and the whole formatted response."""
+        last = format_line(self.partial)
+        self.lines.append(last)
+        self.partial = ""
+        return last, "\n".join(self.lines)
+
+# Rehab replies are read out by a long-lived engine in the background. TTS_WORKERS > 1 runs
+# several engines, which is only safe off Linux (see AudioFilePool).
+# Files are named by content, so a repeated answer reuses its audio.
+audio_pool = AudioFilePool(
+    TEMP_DIR,
+    workers=int(os.getenv("TTS_WORKERS", "1")),
+    rate=180,  # Faster speech rate for liveliness
+    volume=1.0,  # Max volume
+    voices=("female", "zira"),  # Zira is a common female voice on Windows
+)
+# temp_files stays under ARTIFACT_MAX_MB; unused audio and texts expire after ARTIFACT_TTL seconds
+artifacts = ArtifactStore(
+    TEMP_DIR,
+    max_bytes=int(float(os.getenv("ARTIFACT_MAX_MB", "200")) * 2**20),
+    ttl=float(os.getenv("ARTIFACT_TTL", str(24 * 3600))),
+)
+# How long /download_audio waits for audio that is still being synthesized
+AUDIO_WAIT = float(os.getenv("AUDIO_WAIT", "20"))
+
+# Latency per step for /metrics; speech synthesis times are recorded by AudioFilePool
+UPSTREAM_SECONDS = REGISTRY.histogram("chat_upstream_seconds", "Gemini time per reply, to the first streamed chunk, and per whole stream.", ("bot", "phase"))
+UPSTREAM_ERRORS = REGISTRY.counter("chat_upstream_errors", "Gemini calls that failed or timed out.", ("bot",))
+FORMAT_SECONDS = REGISTRY.histogram("chat_format_seconds", "Time to format a whole reply.")
+AUDIO_WAIT_SECONDS = REGISTRY.histogram("chat_audio_wait_seconds", "Time /download_audio waited for synthesis.")
+REQUEST_SECONDS = REGISTRY.histogram("http_request_seconds", "Time to produce a response (streams: until they start).", ("route",))
+upstream_in_flight = collections.Counter()
+
+@contextlib.contextmanager
+def upstream_call(bot):
+    # Gemini calls in flight (including those waiting for a slot) and failures, per bot
+    upstream_in_flight[bot] += 1
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.labels(bot=bot).inc()
+        raise
+    finally:
+        upstream_in_flight[bot] -= 1
+
+def collect_metrics():
+    # Values tracked elsewhere, read at scrape time
+    cache = response_cache.describe()
+    stored = artifacts.describe()
+    sessions = conversations.describe()
+    return [
+        ("chat_upstream_in_flight", "gauge", "Gemini calls in flight or waiting for a slot.",
+         [({"bot": bot}, upstream_in_flight[bot]) for bot in models]),
+        ("chat_cache_entries", "gauge", "Replies held in the response cache.", [({}, cache["entries"])]),
+        ("chat_cache_lookups", "counter", "Response cache lookups by outcome.",
+         [({"outcome": key}, cache.get(key, 0)) for key in ("hits", "misses", "coalesced", "expired")]),
+        ("chat_sessions", "gauge", "Open server-side conversations.", [({}, sessions["sessions"])]),
+        ("chat_audio_queue_depth", "gauge", "Replies waiting for speech synthesis.", [({}, audio_pool.pending())]),
+        ("chat_audio_files", "counter", "Audio requests by outcome.",
+         [({"outcome": key}, audio_pool.stats[key]) for key in ("queued", "joined", "reused", "synthesized", "failed")]),
+        ("chat_artifact_bytes", "gauge", "Bytes held for downloads.",
+         [({"kind": "text"}, stored["text_bytes"]), ({"kind": "file"}, stored["file_bytes"])]),
+    ]
+
+REGISTRY.collector("chatbot", collect_metrics)
+
+# Set by warm_up(); /ready answers 503 until Gemini has been reached once
+readiness = {"ready": False, "error": None}
+warmup_task = None
+
+async def warm_up():
+    # One metadata call per model opens a pooled connection and checks the key before real traffic
+    warm = {model.model_name: model for model in models.values() if hasattr(model, "warm_up")}
+    try:
+        await asyncio.wait_for(asyncio.gather(*(model.warm_up() for model in warm.values())), CHAT_TIMEOUT)
+    except Exception as e:
+        readiness["error"] = f"{type(e).__name__}: {e}"
+    else:
+        readiness.update(ready=True, error=None)
+
+@app.before_serving
+async def start_background_work():
+    # Startup does not wait: the artifact sweeper, speech engines and Gemini warm-up run in the background
+    global warmup_task
+    artifacts.start()
+    audio_pool.start()
+    warmup_task = asyncio.create_task(warm_up())
+
+@app.after_serving
+async def close_client():
+    await client.aclose()
+
+@app.before_request
+async def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+async def record_request_time(response):
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    REQUEST_SECONDS.labels(route=route).observe(time.perf_counter() - g.request_start)
+    return response
 
 @app.route("/chat", methods=["POST"])
-def chat():
-    return handle_chat_request(healthgenix_model)
+async def chat():
+    return await handle_chat_request("healthgenix")
 
 @app.route("/ask", methods=["POST"])
-def ask_dietbot():
-    return handle_chat_request(dietbot_model)
+async def ask_dietbot():
+    return await handle_chat_request("dietbot")
 
 @app.route("/rehab", methods=["POST"])
-def ask_rehabbot():
-    return handle_rehab_request(rehabbot_model)
-
-def handle_chat_request(model):
+async def ask_rehabbot():
+    return await handle_rehab_request("rehabbot")
+
+def format_history(history):
+    return [
+        {"role": "user" if msg["sender"] == "user" else "model", "parts": [{"text": msg["text"]}]}
+        for msg in history if "sender" in msg and "text" in msg
+    ]
+
+async def generate_reply(bot, user_message, formatted_history):
+    """Formatted model reply, shared with identical concurrent or recent requests."""
+    async def ask_model():
+        start = time.perf_counter()
+        with upstream_call(bot):
+            text = await asyncio.wait_for(models[bot].reply(formatted_history, user_message), CHAT_TIMEOUT)
+        replied_at = time.perf_counter()
+        UPSTREAM_SECONDS.labels(bot=bot, phase="reply").observe(replied_at - start)
+        formatted_response = format_response(text)
+        FORMAT_SECONDS.observe(time.perf_counter() - replied_at)
+        return formatted_response
+
+    key = ResponseCache.make_key(bot, user_message, formatted_history)
+    return await response_cache.get_or_compute(key, ask_model)
+
+def conversation_for(bot, data):
+    """Server-side session for this request, or None when the client sends its own history.
+
+    Clients that send a "history" list (even an empty one) and no
+    "session_id" work as before and get no session. Sessions are opt-in: a
+    request without "history", or with "session_id": "new", starts one; any
+    other "session_id" continues that session, or starts a new one if it is
+    unknown or expired. Replies carry the session_id to use.
+    """
+    session_id = data.get("session_id")
+    if session_id is None and "history" in data:
+        return None
+    conversation = conversations.get(session_id, bot) if session_id and session_id != "new" else None
+    return conversation or conversations.create(bot)
+
+async def converse(bot, user_message, data):
+    """Generates the reply for a request; returns it and any extra response fields."""
+    conversation = conversation_for(bot, data)
+    if conversation is None:
+        return await generate_reply(bot, user_message, format_history(data.get("history", []))), {}
+    async with conversation.lock:
+        formatted_response = await generate_reply(bot, user_message, conversation.history())
+        conversation.add(user_message, formatted_response)
+    return formatted_response, {"session_id": conversation.id}
+
+def sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+async def stream_reply(bot, user_message, formatted_history, finish=None, conversation=None):
+    """Server-sent events: "delta" with formatted text as lines complete, then "done".
+
+    The done payload carries the full formatted response, plus whatever
+    finish(response) adds. Replies are cached like the non-streaming ones.
+    With a conversation, its history is used and the turn is added to it.
+    """
+    async with conversation.lock if conversation is not None else contextlib.nullcontext():
+        if conversation is not None:
+            formatted_history = conversation.history()
+        key = ResponseCache.make_key(bot, user_message, formatted_history)
+        try:
+            formatted_response = response_cache.get(key)
+            if formatted_response is not None:
+                yield sse("delta", {"text": formatted_response})
+            else:
+                formatter = LineFormatter()
+                start = time.perf_counter()
+                first_chunk = True
+                with upstream_call(bot):
+                    async for chunk in models[bot].stream(formatted_history, user_message):
+                        if first_chunk:
+                            UPSTREAM_SECONDS.labels(bot=bot, phase="first_chunk").observe(time.perf_counter() - start)
+                            first_chunk = False
+                        text = formatter.feed(chunk)
+                        if text:
+                            yield sse("delta", {"text": text})
+                UPSTREAM_SECONDS.labels(bot=bot, phase="stream").observe(time.perf_counter() - start)
+                last, formatted_response = formatter.finish()
+                if last:
+                    yield sse("delta", {"text": last})
+                response_cache.put(key, formatted_response)
+            done = {"response": formatted_response}
+            if conversation is not None:
+                conversation.add(user_message, formatted_response)
+                done["session_id"] = conversation.id
+            if finish is not None:
+                done.update(finish(formatted_response))
+            yield sse("done", done)
+        except Exception as e:
+            yield sse("error", {"error": str(e)})
+
+async def streaming_request(bot, finish=None):
+    data = await request.get_json()
+    user_message = data.get("message", "").strip()
+    if not user_message:
+        return jsonify({"error": "Message cannot be empty."}), 400
+    conversation = conversation_for(bot, data)
+    stream = stream_reply(bot, user_message, format_history(data.get("history", [])), finish, conversation)
+    return Response(stream, mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def rehab_downloads(formatted_response):
+    # The audio URL is usable straight away; it waits for synthesis if needed
+    audio_file = audio_pool.submit(formatted_response)
+    artifacts.touch(audio_file)
+    return {
+        "audio_url": f"/download_audio?file={audio_file}",
+        "download_url": f"/download_text?id={artifacts.put_text(formatted_response)}"
+    }
+
+@app.route("/chat/stream", methods=["POST"])
+async def chat_stream():
+    return await streaming_request("healthgenix")
+
+@app.route("/ask/stream", methods=["POST"])
+async def ask_dietbot_stream():
+    return await streaming_request("dietbot")
+
+@app.route("/rehab/stream", methods=["POST"])
+async def ask_rehabbot_stream():
+    return await streaming_request("rehabbot", finish=rehab_downloads)
+
+async def handle_chat_request(bot):
     try:
-        data = request.get_json()
+        data = await request.get_json()
         user_message = data.get("message", "").strip()
-        history = data.get("history", [])
 
         if not user_message:
             return jsonify({"error": "Message cannot be empty."}), 400
 
-        formatted_history = [
-            {"role": "user" if msg["sender"] == "user" else "model", "parts": [{"text": msg["text"]}]}
-            for msg in history if "sender" in msg and "text" in msg
-        ]
-
-        chat_session = model.start_chat(history=formatted_history)
-        response = chat_session.send_message(user_message)
-        formatted_response = format_response(response.text)
+        formatted_response, session = await converse(bot, user_message, data)
 
-        return jsonify({"response": formatted_response})
+        return jsonify({"response": formatted_response, **session})
 
+    except asyncio.TimeoutError:
+        return jsonify({"error": "The assistant took too long to answer."}), 504
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def handle_rehab_request(model):
+async def handle_rehab_request(bot):
     try:
-        data = request.get_json()
+        data = await request.get_json()
         user_message = data.get("message", "").strip()
-        history = data.get("history", [])
 
         if not user_message:
             return jsonify({"error": "Message cannot be empty."}), 400
 
-        formatted_history = [
-            {"role": "user" if msg["sender"] == "user" else "model", "parts": [{"text": msg["text"]}]}
-            for msg in history if "sender" in msg and "text" in msg
-        ]
-
-        chat_session = model.start_chat(history=formatted_history)
-        response = chat_session.send_message(user_message)
-        formatted_response = format_response(response.text)
-
-        # Generate audio file
-        audio_file_path = generate_audio(formatted_response)
+        formatted_response, session = await converse(bot, user_message, data)
 
-        return jsonify({
-            "response": formatted_response,
-            "audio_url": f"/download_audio?file={os.path.basename(audio_file_path)}",
-            "download_url": f"/download_text?text={formatted_response}"
-        })
+        # Reply plus links to the spoken and downloadable versions
+        return jsonify({"response": formatted_response, **session, **rehab_downloads(formatted_response)})
 
+    except asyncio.TimeoutError:
+        return jsonify({"error": "The assistant took too long to answer."}), 504
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/conversations/<session_id>", methods=["DELETE"])
+async def close_conversation(session_id):
+    if not conversations.close(session_id):
+        return jsonify({"error": "Session not found."}), 404
+    return jsonify({"message": "Session closed"})
+
+@app.route("/cache_stats", methods=["GET"])
+async def cache_stats():
+    return jsonify({
+        **response_cache.describe(),
+        "artifacts": artifacts.describe(),
+        "audio": dict(audio_pool.stats),
+        "conversations": conversations.describe(),
+    })
+
+@app.route("/ready", methods=["GET"])
+async def ready():
+    # A failed warm-up (e.g. Gemini unreachable at startup) is retried by the next probe
+    global warmup_task
+    if not readiness["ready"] and (warmup_task is None or warmup_task.done()):
+        warmup_task = asyncio.create_task(warm_up())
+    if not readiness["ready"]:
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(asyncio.shield(warmup_task), 5)
+    return jsonify(readiness), 200 if readiness["ready"] else 503
+
+@app.route("/metrics", methods=["GET"])
+async def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@app.route("/profiler", methods=["GET", "POST"])
+async def profiler():
+    # POST {"enabled": true, "interval": 0.005} starts sampling, {"enabled": false} stops it;
+    # GET returns the folded stacks collected so far, for flame graph tools
+    if request.method == "POST":
+        data = await request.get_json(silent=True) or {}
+        return jsonify(PROFILER.toggle(bool(data.get("enabled")), data.get("interval")))
+    return Response(PROFILER.folded(), mimetype="text/plain")
+
 @app.route("/download_text", methods=["GET"])
-def download_text():
-    text = request.args.get("text", "")
-    if not text:
-        return jsonify({"error": "No text provided."}), 400
-    
-    unique_id = str(uuid.uuid4())
-    text_file = os.path.join(TEMP_DIR, f"text_{unique_id}.txt")
-    with open(text_file, "w") as f:
-        f.write(text)
-    
-    return send_file(text_file, as_attachment=True, download_name="rehab_response.txt")
+async def download_text():
+    # Served from memory by artifact ID; ?text= is still accepted from older clients
+    artifact_id = request.args.get("id")
+    if artifact_id is not None:
+        data = artifacts.get_text(artifact_id)
+        if data is None:
+            return jsonify({"error": "Download has expired."}), 404
+    else:
+        data = request.args.get("text", "").encode("utf-8")
+        if not data:
+            return jsonify({"error": "No text provided."}), 400
+
+    return Response(data, mimetype="text/plain", headers={
+        "Content-Disposition": 'attachment; filename="rehab_response.txt"',
+    })
 
 @app.route("/download_audio", methods=["GET"])
-def download_audio():
-    file_name = request.args.get("file", "")
-    file_path = os.path.join(TEMP_DIR, file_name)
-    if not file_name or not os.path.exists(file_path):
+async def download_audio():
+    future = audio_pool.future(request.args.get("file", ""))
+    if future is None:
         return jsonify({"error": "Audio file not found."}), 400
-    
-    return send_file(file_path, mimetype="audio/mpeg")
+    start = time.perf_counter()
+    try:
+        # Shielded so a client giving up does not cancel the synthesis
+        file_path = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), AUDIO_WAIT)
+    except asyncio.TimeoutError:
+        return jsonify({"status": "pending"}), 202, {"Retry-After": "2"}
+    except Exception as e:
+        return jsonify({"error": f"Audio synthesis failed: {e}"}), 500
+    finally:
+        AUDIO_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+    artifacts.touch(os.path.basename(file_path))
+    # conditional=True answers Range requests with 206 partial content
+    return await send_file(file_path, mimetype="audio/mpeg", conditional=True)
 
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5000)
\ No newline at end of file
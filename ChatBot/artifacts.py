@@ -0,0 +1,124 @@
+"""Bounded storage for generated downloads: reply texts in memory, audio files on disk."""
+import collections
+import hashlib
+import os
+import threading
+import time
+
+
+class ArtifactStore:
+    """Keeps downloadable artifacts within a size budget.
+
+    Texts live in memory under a content hash and are served from there.
+    Files in directory (written by others, e.g. AudioFilePool) are deleted
+    once unused for ttl seconds, and least recently used first whenever they
+    exceed max_bytes. Call touch() when a file is handed out or served, and
+    start() to run sweep() every sweep_interval seconds.
+    """
+
+    def __init__(self, directory, max_bytes=200 * 2**20, ttl=24 * 3600, max_text_bytes=16 * 2**20, sweep_interval=60):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_text_bytes = max_text_bytes
+        self.sweep_interval = sweep_interval
+        self.stats = collections.Counter()
+        self.file_bytes = 0
+        self._texts = collections.OrderedDict()
+        self._text_bytes = 0
+        self._accessed = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+
+    def put_text(self, text):
+        """Stores text and returns its artifact ID."""
+        data = text.encode("utf-8")
+        artifact_id = hashlib.sha256(data).hexdigest()[:32]
+        with self._lock:
+            if artifact_id in self._texts:
+                self._texts.move_to_end(artifact_id)
+            else:
+                self._text_bytes += len(data)
+            self._texts[artifact_id] = (time.time(), data)
+            while self._text_bytes > self.max_text_bytes and len(self._texts) > 1:
+                self._evict_text()
+        return artifact_id
+
+    def get_text(self, artifact_id):
+        """Returns the stored bytes for artifact_id, or None once expired or evicted."""
+        with self._lock:
+            entry = self._texts.get(artifact_id)
+            if entry is None or entry[0] < time.time() - self.ttl:
+                return None
+            self._texts.move_to_end(artifact_id)
+            return entry[1]
+
+    def _evict_text(self):
+        # Called with self._lock held
+        _, (_, data) = self._texts.popitem(last=False)
+        self._text_bytes -= len(data)
+        self.stats["texts_evicted"] += 1
+
+    def touch(self, name):
+        """Marks a file in directory as recently used."""
+        with self._lock:
+            self._accessed[name] = time.time()
+
+    def sweep(self):
+        """Deletes expired files and texts, then least recently used files beyond max_bytes."""
+        now = time.time()
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                stat = entry.stat()
+                files.append((entry.name, stat.st_size, stat.st_mtime))
+        with self._lock:
+            while self._texts and next(iter(self._texts.values()))[0] < now - self.ttl:
+                self._evict_text()
+            files = [(max(mtime, self._accessed.get(name, 0)), size, name) for name, size, mtime in files]
+            present = {name for _, _, name in files}
+            self._accessed = {name: when for name, when in self._accessed.items() if name in present}
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        removed = []
+        for last_used, size, name in files:
+            expired = last_used < now - self.ttl
+            # Partial files belong to a synthesis in progress unless they are stale
+            if not expired and (total <= self.max_bytes or name.startswith(".")):
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+            removed.append(name)
+        with self._lock:
+            for name in removed:
+                self._accessed.pop(name, None)
+        self.file_bytes = total
+        self.stats["files_removed"] += len(removed)
+        return len(removed)
+
+    def start(self):
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._run, name="artifact-sweeper", daemon=True)
+            self._sweeper.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                self.sweep()
+            except OSError as e:
+                print("Artifact sweep failed:", e)
+            time.sleep(self.sweep_interval)
+
+    def describe(self):
+        with self._lock:
+            return {
+                "texts": len(self._texts),
+                "text_bytes": self._text_bytes,
+                "file_bytes": self.file_bytes,
+                **self.stats,
+            }
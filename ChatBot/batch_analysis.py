@@ -0,0 +1,178 @@
+"""Headless batch analysis of recorded workout videos.
+
+Runs the same analysis as the live trainer (analyze_exercise feedback and
+the rep state machine) over video files, spreading files and chunks of long
+files across a process pool with one MediaPipe Pose instance per worker.
+
+    python batch_analysis.py ../uploads/* --exercise Squat --workers 8
+"""
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from healthgenix.kinematics import NUM_LANDMARKS, landmarks_to_array
+from healthgenix.recording import save_recording
+from healthgenix.smoothing import KeypointSmoother
+from pose_estimation import analyze_exercise, mp_pose, rules, update_rep_state
+
+# Frames per work item; long videos are split so every core stays busy
+CHUNK_FRAMES = 1800
+
+# Per-process Pose instance, created by the pool initializer
+worker_pose = None
+
+
+def init_worker():
+    global worker_pose
+    worker_pose = mp_pose.Pose(min_detection_confidence=0.8, min_tracking_confidence=0.8)
+
+
+def plan_chunks(path, chunk_frames=CHUNK_FRAMES):
+    """Splits a video into (start, stop) frame ranges."""
+    cap = cv2.VideoCapture(path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total <= 0:
+        # Unknown length: process the whole file as one chunk
+        return [(0, None)]
+    return [(start, min(start + chunk_frames, total)) for start in range(0, total, chunk_frames)]
+
+
+def analyze_chunk(path, exercise, start, stop):
+    """Runs pose inference and per-frame analysis over frames [start, stop) of one video."""
+    # The worker's Pose tracks and smooths across frames; start each chunk from a clean graph
+    # so nothing carries over from the previous chunk or video
+    worker_pose.reset()
+    smoother = KeypointSmoother()
+    cap = cv2.VideoCapture(path)
+    # Re-read a few frames before the chunk so the smoother is warm at its first frame
+    warmup = min(start, smoother.window_length - 1)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start - warmup)
+
+    frames, timestamps, landmarks, feedback = [], [], [], []
+    index = start - warmup
+    while stop is None or index < stop:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        timestamp = cap.get(cv2.CAP_PROP_POS_MSEC)
+        results = worker_pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if results.pose_landmarks:
+            points = landmarks_to_array(results.pose_landmarks.landmark)
+            frame_feedback = analyze_exercise(None, points, exercise, smoother)
+        else:
+            points = np.full((NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+            frame_feedback = []
+        if index >= start:
+            frames.append(index)
+            timestamps.append(timestamp)
+            landmarks.append(points)
+            feedback.append(frame_feedback)
+        index += 1
+    cap.release()
+
+    return {
+        "frames": np.array(frames, dtype=np.int64),
+        "timestamps": np.array(timestamps, dtype=np.float64),
+        "landmarks": np.array(landmarks, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 4),
+        "feedback": feedback,
+    }
+
+
+def count_reps(exercise, angles, timestamps, frames):
+    """Replays the rep state machine over per-frame angles and returns rep events."""
+    events = []
+    state = "up"
+    for i, row in enumerate(angles):
+        if np.isnan(row).any():
+            continue
+        state, rep_completed = update_rep_state(exercise, row, state)
+        if rep_completed:
+            events.append({"frame": int(frames[i]), "timestamp_ms": float(timestamps[i]), "rep": len(events) + 1})
+    return events
+
+
+def merge_chunks(exercise, chunks):
+    """Joins chunk results in order, computes angles and rep events for the whole video."""
+    landmarks = np.concatenate([c["landmarks"] for c in chunks])
+    timestamps = np.concatenate([c["timestamps"] for c in chunks])
+    frames = np.concatenate([c["frames"] for c in chunks])
+    # Angles are computed for the whole session in one vectorized pass
+    angles = rules.compute_angles(landmarks)
+    return {
+        "frames": frames,
+        "timestamps": timestamps,
+        "landmarks": landmarks,
+        "angles": angles,
+        "feedback": [fb for c in chunks for fb in c["feedback"]],
+        "reps": count_reps(exercise, angles, timestamps, frames),
+    }
+
+
+def save_result(path, exercise, result, output_dir):
+    """Writes a landmark recording, per-frame angles and a JSON summary for one video."""
+    name = os.path.basename(path)
+    # The recording can be re-scored later with replay.py without re-running inference
+    save_recording(os.path.join(output_dir, f"{name}.landmarks.npy"), result["timestamps"] / 1000.0, result["landmarks"])
+    np.savez_compressed(
+        os.path.join(output_dir, f"{name}.npz"),
+        frames=result["frames"],
+        angles=result["angles"],
+        angle_names=np.array(rules.angle_names),
+    )
+    summary = {
+        "video": path,
+        "exercise": exercise,
+        "frames": len(result["frames"]),
+        "frames_with_pose": int((~np.isnan(result["landmarks"][:, 0, 0])).sum()),
+        "rep_count": len(result["reps"]),
+        "reps": result["reps"],
+        "feedback": result["feedback"],
+    }
+    with open(os.path.join(output_dir, f"{name}.json"), "w") as file:
+        json.dump(summary, file)
+    return summary
+
+
+def run_batch(paths, exercise, output_dir, workers=None, chunk_frames=CHUNK_FRAMES):
+    """Analyzes every video in paths and returns {path: summary}."""
+    os.makedirs(output_dir, exist_ok=True)
+    # spawn keeps MediaPipe's threads out of forked children
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker) as pool:
+        futures = {
+            path: [pool.submit(analyze_chunk, path, exercise, start, stop) for start, stop in plan_chunks(path, chunk_frames)]
+            for path in paths
+        }
+        summaries = {}
+        for path, chunk_futures in futures.items():
+            try:
+                chunks = [future.result() for future in chunk_futures]
+            except Exception as e:
+                print(f"Failed to analyze {path}: {e}")
+                continue
+            summaries[path] = save_result(path, exercise, merge_chunks(exercise, chunks), output_dir)
+            print(f"{path}: {summaries[path]['rep_count']} reps over {summaries[path]['frames']} frames")
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze recorded workout videos without a camera or display.")
+    parser.add_argument("videos", nargs="+", help="video files to analyze")
+    parser.add_argument("--exercise", default="Squat", help="exercise performed in the videos")
+    parser.add_argument("--output", default="batch_results", help="directory for per-video results")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-frames", type=int, default=CHUNK_FRAMES, help="frames per work item")
+    args = parser.parse_args()
+    run_batch(args.videos, args.exercise, args.output, args.workers, args.chunk_frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Server-side chat sessions whose history is kept within a token budget."""
+import asyncio
+import collections
+import re
+import time
+import uuid
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def gist(text, limit=160):
+    """First sentence of text, shortened to limit characters."""
+    sentence = re.split(r"(?<=[.!?])\s|\n", text.strip(), maxsplit=1)[0].strip("*-• ")
+    return sentence if len(sentence) <= limit else sentence[:limit - 3].rstrip() + "..."
+
+
+class Conversation:
+    """One session's history: recent exchanges verbatim, older ones as a short summary.
+
+    Once the exchanges exceed token_budget the oldest are folded into the
+    summary, one line each, and the summary itself keeps only its newest
+    lines within summary_budget. The latest exchange is always kept whole.
+    """
+
+    def __init__(self, conversation_id, bot, token_budget=1500, summary_budget=300):
+        self.id = conversation_id
+        self.bot = bot
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.exchanges = collections.deque()
+        self.summary = collections.deque()
+        self.tokens = 0
+        self.summary_tokens = 0
+        self.last_active = time.time()
+        # Turns of one conversation are answered in order
+        self.lock = asyncio.Lock()
+
+    def add(self, user_text, model_text):
+        tokens = estimate_tokens(user_text) + estimate_tokens(model_text)
+        self.exchanges.append((user_text, model_text, tokens))
+        self.tokens += tokens
+        self.last_active = time.time()
+        while len(self.exchanges) > 1 and self.tokens > self.token_budget:
+            user_text, model_text, tokens = self.exchanges.popleft()
+            self.tokens -= tokens
+            line = f"- User: {gist(user_text)} / Assistant: {gist(model_text)}"
+            self.summary.append((line, estimate_tokens(line)))
+            self.summary_tokens += self.summary[-1][1]
+            while len(self.summary) > 1 and self.summary_tokens > self.summary_budget:
+                self.summary_tokens -= self.summary.popleft()[1]
+
+    def history(self):
+        """The history to send with the next message, in Gemini contents format."""
+        history = []
+        if self.summary:
+            lines = "\n".join(line for line, _ in self.summary)
+            history.append({"role": "user", "parts": [{"text": f"Summary of our earlier conversation:\n{lines}"}]})
+            history.append({"role": "model", "parts": [{"text": "Noted."}]})
+        for user_text, model_text, _ in self.exchanges:
+            history.append({"role": "user", "parts": [{"text": user_text}]})
+            history.append({"role": "model", "parts": [{"text": model_text}]})
+        return history
+
+
+class ConversationStore:
+    """Conversations by ID, dropping the least recently used beyond max_sessions or after idle_ttl seconds."""
+
+    def __init__(self, max_sessions=1000, idle_ttl=3600, token_budget=1500):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.token_budget = token_budget
+        self.stats = collections.Counter()
+        self._conversations = collections.OrderedDict()
+
+    def create(self, bot):
+        self.sweep()
+        conversation = Conversation(uuid.uuid4().hex, bot, token_budget=self.token_budget)
+        self._conversations[conversation.id] = conversation
+        while len(self._conversations) > self.max_sessions:
+            self._conversations.popitem(last=False)
+            self.stats["evicted"] += 1
+        self.stats["created"] += 1
+        return conversation
+
+    def get(self, conversation_id, bot):
+        """The live conversation with this ID for this bot, or None."""
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None or conversation.bot != bot or conversation.last_active < time.time() - self.idle_ttl:
+            return None
+        self._conversations.move_to_end(conversation_id)
+        return conversation
+
+    def close(self, conversation_id):
+        return self._conversations.pop(conversation_id, None) is not None
+
+    def sweep(self):
+        cutoff = time.time() - self.idle_ttl
+        while self._conversations:
+            conversation = next(iter(self._conversations.values()))
+            if conversation.last_active >= cutoff:
+                break
+            del self._conversations[conversation.id]
+            self.stats["expired"] += 1
+
+    def describe(self):
+        return {"sessions": len(self._conversations), **self.stats}
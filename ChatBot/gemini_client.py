@@ -0,0 +1,104 @@
+"""Non-blocking Gemini REST client with one connection pool shared by every bot."""
+import asyncio
+import json
+
+import httpx
+
+API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+
+
+class GeminiClient:
+    """Pooled HTTP connections to the Gemini API.
+
+    base_url can point at a local fake server for tests and load runs. The
+    underlying httpx client is created on first use inside the running event
+    loop and reused by all models until aclose().
+    """
+
+    def __init__(self, api_key, base_url=API_BASE, max_connections=100, timeout=30.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._http = None
+        self._loop = None
+
+    def http(self):
+        if not self.api_key:
+            raise RuntimeError("GOOGLE_API_KEY is not configured")
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._loop is not loop:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"x-goog-api-key": self.api_key},
+                limits=self.limits,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+            )
+            self._loop = loop
+        return self._http
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+def reply_text(payload):
+    """Joins the text parts of the first candidate in a generateContent response."""
+    candidates = payload.get("candidates") or []
+    if not candidates:
+        reason = payload.get("promptFeedback", {}).get("blockReason", "no candidates")
+        raise ValueError(f"Gemini returned no reply ({reason})")
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+
+class ChatModel:
+    """One bot: a Gemini model with its instructions, generation settings and concurrency limit.
+
+    At most max_concurrency calls per bot are in flight; further requests
+    wait for a slot, so one busy bot cannot take the whole connection pool.
+    history uses the Gemini contents format: [{"role", "parts": [{"text"}]}].
+    """
+
+    def __init__(self, client, model_name, system_instruction, generation_config, max_concurrency=16):
+        self.client = client
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.generation_config = generation_config
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _body(self, history, message):
+        return {
+            "systemInstruction": {"parts": [{"text": self.system_instruction}]},
+            "contents": list(history) + [{"role": "user", "parts": [{"text": message}]}],
+            "generationConfig": self.generation_config,
+        }
+
+    async def warm_up(self):
+        """Fetches the model's metadata: opens a pooled connection and checks the key and model name."""
+        response = await self.client.http().get(f"/models/{self.model_name}")
+        response.raise_for_status()
+
+    async def reply(self, history, message):
+        """Returns the full reply text."""
+        async with self.semaphore:
+            response = await self.client.http().post(
+                f"/models/{self.model_name}:generateContent", json=self._body(history, message)
+            )
+            response.raise_for_status()
+            return reply_text(response.json())
+
+    async def stream(self, history, message):
+        """Yields the reply text in chunks as Gemini generates it."""
+        async with self.semaphore:
+            async with self.client.http().stream(
+                "POST", f"/models/{self.model_name}:streamGenerateContent",
+                params={"alt": "sse"}, json=self._body(history, message),
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line.startswith("data:"):
+                        text = reply_text(json.loads(line[5:]))
+                        if text:
+                            yield text
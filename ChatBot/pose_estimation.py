@@ -1,167 +1,94 @@
 import cv2
 import mediapipe as mp
 import numpy as np
-from scipy.signal import savgol_filter
 import math
-import csv
 import time
-import pyttsx3
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from healthgenix.exercises import RuleEngine
+from healthgenix.governor import PoseGovernor
+from healthgenix.metrics import REGISTRY, RateMeter, start_http_server
+from healthgenix.recording import LandmarkRecorder
+from healthgenix.results import ResultsStore
+from healthgenix.scheduler import InferenceScheduler
+from healthgenix.smoothing import KeypointSmoother
+from healthgenix.speech import PRIORITY_HIGH, SpeechQueue
 
 # Initialize MediaPipe Pose
 mp_pose = mp.solutions.pose
 mp_drawing = mp.solutions.drawing_utils
-pose = mp_pose.Pose(min_detection_confidence=0.8, min_tracking_confidence=0.8)
+
+# Set POSE_INFERENCE_EVERY=k to run the pose model on every k-th frame and predict the frames in between
+INFERENCE_EVERY = int(os.getenv("POSE_INFERENCE_EVERY", "1"))
+# Model complexity and input size adapt to keep this frame rate (see PoseGovernor); 0 runs a fixed model
+TARGET_FPS = float(os.getenv("POSE_TARGET_FPS", "30"))
 
 # Colors for UI
 BLACK = (0, 0, 0)
 AQUA = (0, 255, 255)  # BGR format for OpenCV
 WHITE = (255, 255, 255)
 
-# Initialize text-to-speech engine
-engine = pyttsx3.init()
-engine.setProperty('rate', 150)  # Speed of speech
-
-# Function to calculate angle between three points
-def calculate_angle(a, b, c):
-    a = np.array(a)  # First point
-    b = np.array(b)  # Mid point (pivot)
-    c = np.array(c)  # End point
-    radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - np.arctan2(a[1] - b[1], a[0] - b[0])
-    angle = np.abs(radians * 180.0 / np.pi)
-    if angle > 180.0:
-        angle = 360 - angle
-    return angle
-
-# Function to smooth keypoint data
-def smooth_keypoints(keypoints_history, window_length=5, polyorder=2):
-    if len(keypoints_history) < window_length:
-        # Return the latest keypoints if history is too short
-        return keypoints_history[-1][1]
-    keypoints_array = np.array([kp[1] for kp in keypoints_history])  # Extract y-coordinates
-    smoothed = savgol_filter(keypoints_array, window_length, polyorder, axis=0)
-    return smoothed[-1]
-
-# Function to save results to CSV
-def save_to_csv(exercise, rep_count, timestamp):
-    csv_path = 'exercise_results.csv'
-    # Check if file exists, if not create with headers
-    if not os.path.exists(csv_path):
-        with open(csv_path, mode='w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(["Exercise", "Rep Count", "Timestamp"])
-    # Append data
-    with open(csv_path, mode='a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([exercise, rep_count, timestamp])
-    print(f"Saved to CSV: {exercise}, {rep_count}, {timestamp}")  # Debug log
-
-# Main exercise analysis function
-def analyze_exercise(image, landmarks, exercise, history):
-    feedback = []
-    keypoints = {
-        'left_shoulder': (landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER].x, landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER].y),
-        'right_shoulder': (landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER].x, landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER].y),
-        'left_elbow': (landmarks[mp_pose.PoseLandmark.LEFT_ELBOW].x, landmarks[mp_pose.PoseLandmark.LEFT_ELBOW].y),
-        'right_elbow': (landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW].x, landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW].y),
-        'left_wrist': (landmarks[mp_pose.PoseLandmark.LEFT_WRIST].x, landmarks[mp_pose.PoseLandmark.LEFT_WRIST].y),
-        'right_wrist': (landmarks[mp_pose.PoseLandmark.RIGHT_WRIST].x, landmarks[mp_pose.PoseLandmark.RIGHT_WRIST].y),
-        'left_hip': (landmarks[mp_pose.PoseLandmark.LEFT_HIP].x, landmarks[mp_pose.PoseLandmark.LEFT_HIP].y),
-        'right_hip': (landmarks[mp_pose.PoseLandmark.RIGHT_HIP].x, landmarks[mp_pose.PoseLandmark.RIGHT_HIP].y),
-        'left_knee': (landmarks[mp_pose.PoseLandmark.LEFT_KNEE].x, landmarks[mp_pose.PoseLandmark.LEFT_KNEE].y),
-        'right_knee': (landmarks[mp_pose.PoseLandmark.RIGHT_KNEE].x, landmarks[mp_pose.PoseLandmark.RIGHT_KNEE].y),
-        'left_ankle': (landmarks[mp_pose.PoseLandmark.LEFT_ANKLE].x, landmarks[mp_pose.PoseLandmark.LEFT_ANKLE].y),
-        'right_ankle': (landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE].x, landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE].y),
-    }
-
-    # Smooth keypoints
-    history.append([exercise, [landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER].y, landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER].y,
-                              landmarks[mp_pose.PoseLandmark.LEFT_ELBOW].y, landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW].y,
-                              landmarks[mp_pose.PoseLandmark.LEFT_WRIST].y, landmarks[mp_pose.PoseLandmark.RIGHT_WRIST].y,
-                              landmarks[mp_pose.PoseLandmark.LEFT_HIP].y, landmarks[mp_pose.PoseLandmark.RIGHT_HIP].y,
-                              landmarks[mp_pose.PoseLandmark.LEFT_KNEE].y, landmarks[mp_pose.PoseLandmark.RIGHT_KNEE].y,
-                              landmarks[mp_pose.PoseLandmark.LEFT_ANKLE].y, landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE].y]])
-    smoothed_keypoints = smooth_keypoints(history)
-    keypoints = {k: (v[0], smoothed_keypoints[list(keypoints.keys()).index(k)]) for k, v in keypoints.items()}
-
-    # Analyze based on exercise type with stricter thresholds for 100% accuracy
-    if exercise == "Pull-Ups/Chin-Ups":
-        elbow_angle = calculate_angle(keypoints['left_shoulder'], keypoints['left_elbow'], keypoints['left_wrist'])
-        shoulder_angle = calculate_angle(keypoints['left_elbow'], keypoints['left_shoulder'], keypoints['left_hip'])
-        hip_angle = calculate_angle(keypoints['left_shoulder'], keypoints['left_hip'], keypoints['left_knee'])
-        
-        if elbow_angle > 165:
-            feedback.append("Bend your elbows more!")
-        elif elbow_angle < 40:
-            feedback.append("Don't over-bend your elbows!")
-        if shoulder_angle > 95:
-            feedback.append("Pull your shoulders down!")
-        if abs(hip_angle - 180) > 5:
-            feedback.append("Keep your body straight!")
+# Exercise feedback and rep rules, compiled once (see healthgenix/exercises.py)
+rules = RuleEngine()
 
-    elif exercise == "Squat":
-        knee_angle = calculate_angle(keypoints['left_hip'], keypoints['left_knee'], keypoints['left_ankle'])
-        hip_angle = calculate_angle(keypoints['left_shoulder'], keypoints['left_hip'], keypoints['left_knee'])
-        ankle_angle = calculate_angle(keypoints['left_knee'], keypoints['left_ankle'], (keypoints['left_ankle'][0] + 0.1, keypoints['left_ankle'][1]))
-        
-        if knee_angle > 95:
-            feedback.append("Go deeper into your squat!")
-        elif knee_angle < 65:
-            feedback.append("Don't squat too deep!")
-        if hip_angle < 95:
-            feedback.append("Push your hips back more!")
-        if ankle_angle > 25:
-            feedback.append("Reduce forward lean!")
+# Initialize text-to-speech worker; announcements never block the frame loop
+speech = SpeechQueue(rate=150)  # Speed of speech
 
-    elif exercise == "Deadlift":
-        hip_angle = calculate_angle(keypoints['left_shoulder'], keypoints['left_hip'], keypoints['left_knee'])
-        knee_angle = calculate_angle(keypoints['left_hip'], keypoints['left_knee'], keypoints['left_ankle'])
-        spine_angle = calculate_angle(keypoints['left_shoulder'], keypoints['left_hip'], keypoints['right_hip'])
-        
-        if hip_angle < 75:
-            feedback.append("Hinge more at the hips!")
-        elif hip_angle > 95 and knee_angle < 165:
-            feedback.append("Stand up fully!")
-        if knee_angle < 125:
-            feedback.append("Bend your knees less!")
-        if abs(spine_angle - 180) > 5:
-            feedback.append("Keep your spine neutral!")
+# Completed sets are stored in SQLite by a background writer (see healthgenix/results.py)
+RESULTS_DB = os.getenv("RESULTS_DB", "exercise_results.db")
+# Also appended to the CSV that the admin Gym Analytics feed (server.js /exercise-results) reads
+RESULTS_CSV = os.getenv("RESULTS_CSV", "exercise_results.csv")
 
-    elif exercise == "Bent-Over Rows":
-        torso_angle = calculate_angle(keypoints['left_hip'], keypoints['left_shoulder'], (keypoints['left_shoulder'][0], keypoints['left_shoulder'][1] + 0.1))
-        elbow_angle = calculate_angle(keypoints['left_shoulder'], keypoints['left_elbow'], keypoints['left_wrist'])
-        shoulder_angle = calculate_angle(keypoints['left_elbow'], keypoints['left_shoulder'], keypoints['left_hip'])
-        
-        if abs(torso_angle - 45) > 5:
-            feedback.append("Maintain a 45-degree torso angle!")
-        if elbow_angle > 95:
-            feedback.append("Bend your elbows more!")
-        if shoulder_angle < 35:
-            feedback.append("Retract your shoulders!")
+# Set METRICS_PORT to serve /metrics and /profiler while a session runs (see healthgenix/metrics.py)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+STAGE_SECONDS = REGISTRY.histogram("pose_stage_seconds", "Time spent in each step of analysing one frame.", ("stage",))
 
-    elif exercise == "Bicep Curls":
-        elbow_angle = calculate_angle(keypoints['left_shoulder'], keypoints['left_elbow'], keypoints['left_wrist'])
-        wrist_angle = calculate_angle(keypoints['left_elbow'], keypoints['left_wrist'], (keypoints['left_wrist'][0] + 0.1, keypoints['left_wrist'][1]))
-        torso_angle = calculate_angle(keypoints['left_shoulder'], keypoints['left_hip'], (keypoints['left_hip'][0], keypoints['left_hip'][1] + 0.1))
-        
-        if elbow_angle > 165:
-            feedback.append("Bend your elbows more!")
-        elif elbow_angle < 40:
-            feedback.append("Don't over-bend your elbows!")
-        if abs(wrist_angle) > 5:
-            feedback.append("Keep your wrists neutral!")
-        if abs(torso_angle - 90) > 3:
-            feedback.append("Stop swinging your torso!")
+# Main exercise analysis function: smooth keypoints, then evaluate every feedback rule for the exercise
+def analyze_exercise(image, points, exercise, smoother):
+    angles = rules.compute_angles(smoother.update(points))
+    return rules.feedback(exercise, angles)
 
-    return feedback
+# Rep state machine: a rep is counted on the down -> up transition
+def update_rep_state(exercise, angles, state):
+    return rules.update_rep_state(exercise, angles, state)
 
-# Main video processing loop
-def main():
+# Main video processing loop; record_path saves the landmark stream for replay
+def main(record_path=None):
     cap = cv2.VideoCapture(0)  # Open webcam
     if not cap.isOpened():
         print("Error: Could not open webcam.")
         return
 
+    # The model is only loaded for live sessions; replay and batch tools import this module too
+    # When every frame is inferred, MediaPipe's tracking mode is the cheapest: it crops around the
+    # previous landmarks itself and only runs the person detector after losing track. When frames
+    # are skipped the scheduler crops instead, and its moving crops need a static-mode model.
+    tracking = INFERENCE_EVERY == 1
+    def make_pose(complexity=1):
+        if tracking:
+            return mp_pose.Pose(model_complexity=complexity, min_detection_confidence=0.8, min_tracking_confidence=0.8)
+        return mp_pose.Pose(static_image_mode=True, model_complexity=complexity, min_detection_confidence=0.8)
+    pose = PoseGovernor(make_pose, TARGET_FPS, frames_per_inference=INFERENCE_EVERY) if TARGET_FPS else make_pose()
+    # Speech engine and model graph initialize now rather than on the first rep and frame
+    speech.start()
+    pose.process(np.zeros((480, 640, 3), dtype=np.uint8))
+    scheduler = InferenceScheduler(pose, every=INFERENCE_EVERY, crop=not tracking)
+    recorder = LandmarkRecorder(record_path) if record_path else None
+    results_store = ResultsStore(RESULTS_DB, csv_path=RESULTS_CSV or None)
+    fps = RateMeter()
+    if METRICS_PORT:
+        REGISTRY.collector("pose_estimation", lambda: [
+            ("pose_output_fps", "gauge", "Frames per second shown on screen.", [({}, round(fps.rate(), 2))]),
+            ("pose_frames", "counter", "Frames by how the pose was obtained.",
+             [({"mode": mode}, scheduler.stats[mode]) for mode in ("full_frame", "roi", "predicted")]),
+            ("speech_queue_depth", "gauge", "Announcements waiting to be spoken.", [({}, len(speech))]),
+            ("speech_skipped", "counter", "Announcements replaced by a newer one before being spoken.", [({}, speech.skipped)]),
+        ])
+        start_http_server(METRICS_PORT)
+        print(f"Serving metrics on port {METRICS_PORT}")
+
     # Set fullscreen mode
     cv2.namedWindow("State-of-the-Art Gym Training", cv2.WND_PROP_FULLSCREEN)
     cv2.setWindowProperty("State-of-the-Art Gym Training", cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
@@ -169,7 +96,7 @@ def main():
     exercises = ["Pull-Ups/Chin-Ups", "Squat", "Deadlift", "Bent-Over Rows", "Bicep Curls"]
     exercise_index = 0
     exercise = exercises[exercise_index]
-    keypoints_history = []
+    smoother = KeypointSmoother()
     rep_count = 0
     state = "up"  # Tracks exercise state (up/down)
     last_spoken_count = -1
@@ -177,116 +104,51 @@ def main():
     challenge_over_time = 0
 
     while cap.isOpened():
+        start = time.perf_counter()
         ret, frame = cap.read()
         if not ret:
             print("Error: Failed to capture frame.")
             break
+        captured_at = time.perf_counter()
+        STAGE_SECONDS.labels(stage="capture").observe(captured_at - start)
 
-        # Get screen dimensions and resize frame to fullscreen
-        screen_width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-        screen_height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-        image = cv2.resize(frame, (int(screen_width), int(screen_height)))
+        # The fullscreen window scales the frame on display, so it is used at capture size
+        image = frame
 
-        # Convert BGR to RGB for MediaPipe
+        # Convert BGR to RGB for MediaPipe; the scheduler crops or skips inference as configured
         image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = pose.process(image_rgb)
-        image = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
+        results = scheduler.process(image_rgb)
+        inferred_at = time.perf_counter()
+        STAGE_SECONDS.labels(stage="inference" if results.inferred else "prediction").observe(inferred_at - captured_at)
+        points = results.points
+        if recorder is not None:
+            recorder.add(time.time(), points)
 
         if results.pose_landmarks:
             mp_drawing.draw_landmarks(image, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+            drawn_at = time.perf_counter()
+
+            # Compute all joint angles for this frame in one pass
+            angles = rules.compute_angles(points)
 
             # Analyze exercise and get feedback
-            feedback = analyze_exercise(image, results.pose_landmarks.landmark, exercise, keypoints_history)
+            feedback = analyze_exercise(image, points, exercise, smoother)
 
             # Count reps and provide voice feedback if challenge not over
             if rep_count < 5:
-                if exercise == "Pull-Ups/Chin-Ups":
-                    elbow_angle = calculate_angle(
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER].y),
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_ELBOW].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_ELBOW].y),
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_WRIST].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_WRIST].y)
-                    )
-                    if elbow_angle < 60 and state == "up":
-                        state = "down"
-                    elif elbow_angle > 165 and state == "down":
-                        state = "up"
-                        rep_count += 1
-                        if rep_count != last_spoken_count:
-                            engine.say(f"Count {rep_count}")
-                            engine.runAndWait()
-                            last_spoken_count = rep_count
-
-                elif exercise == "Squat":
-                    knee_angle = calculate_angle(
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_HIP].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_HIP].y),
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_KNEE].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_KNEE].y),
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_ANKLE].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_ANKLE].y)
-                    )
-                    if knee_angle < 95 and state == "up":
-                        state = "down"
-                    elif knee_angle > 155 and state == "down":
-                        state = "up"
-                        rep_count += 1
-                        if rep_count != last_spoken_count:
-                            engine.say(f"Count {rep_count}")
-                            engine.runAndWait()
-                            last_spoken_count = rep_count
-
-                elif exercise == "Deadlift":
-                    hip_angle = calculate_angle(
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER].y),
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_HIP].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_HIP].y),
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_KNEE].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_KNEE].y)
-                    )
-                    if hip_angle < 85 and state == "up":
-                        state = "down"
-                    elif hip_angle > 165 and state == "down":
-                        state = "up"
-                        rep_count += 1
-                        if rep_count != last_spoken_count:
-                            engine.say(f"Count {rep_count}")
-                            engine.runAndWait()
-                            last_spoken_count = rep_count
-
-                elif exercise == "Bent-Over Rows":
-                    elbow_angle = calculate_angle(
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER].y),
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_ELBOW].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_ELBOW].y),
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_WRIST].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_WRIST].y)
-                    )
-                    if elbow_angle < 95 and state == "up":
-                        state = "down"
-                    elif elbow_angle > 165 and state == "down":
-                        state = "up"
-                        rep_count += 1
-                        if rep_count != last_spoken_count:
-                            engine.say(f"Count {rep_count}")
-                            engine.runAndWait()
-                            last_spoken_count = rep_count
-
-                elif exercise == "Bicep Curls":
-                    elbow_angle = calculate_angle(
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER].y),
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_ELBOW].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_ELBOW].y),
-                        (results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_WRIST].x, results.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_WRIST].y)
-                    )
-                    if elbow_angle < 60 and state == "up":
-                        state = "down"
-                    elif elbow_angle > 165 and state == "down":
-                        state = "up"
-                        rep_count += 1
-                        if rep_count != last_spoken_count:
-                            engine.say(f"Count {rep_count}")
-                            engine.runAndWait()
-                            last_spoken_count = rep_count
+                state, rep_completed = update_rep_state(exercise, angles, state)
+                if rep_completed:
+                    rep_count += 1
+                    if rep_count != last_spoken_count:
+                        speech.say(f"Count {rep_count}", key="count")
+                        last_spoken_count = rep_count
 
             # Switch exercise after 5 reps
             if rep_count >= 5 and not challenge_over:
-                save_to_csv(exercise, rep_count, time.strftime("%Y-%m-%d %H:%M:%S"))
+                results_store.record(exercise, rep_count)
                 challenge_over = True
                 challenge_over_time = time.time()
-                engine.say("Challenge Over")
-                engine.runAndWait()
+                speech.say("Challenge Over", priority=PRIORITY_HIGH)
 
             # Reset to next exercise after 3 seconds
             if challenge_over and (time.time() - challenge_over_time) > 3:
@@ -294,12 +156,13 @@ def main():
                 state = "up"
                 exercise_index = (exercise_index + 1) % len(exercises)
                 exercise = exercises[exercise_index]
-                keypoints_history = []  # Reset history for new exercise
+                smoother.reset()  # Reset history for new exercise
                 challenge_over = False
-                engine.say(f"Switching to {exercise}")
-                engine.runAndWait()
+                speech.say(f"Switching to {exercise}", priority=PRIORITY_HIGH)
 
             # Display UI fullscreen
+            analysed_at = time.perf_counter()
+            STAGE_SECONDS.labels(stage="analysis").observe(analysed_at - drawn_at)
             image_height, image_width = image.shape[:2]
             cv2.putText(image, f"Exercise: {exercise}", (int(image_width * 0.05), int(image_height * 0.05)), 
                         cv2.FONT_HERSHEY_SIMPLEX, 1.5, AQUA, 3, cv2.LINE_AA)
@@ -312,16 +175,25 @@ def main():
             for i, fb in enumerate(feedback):
                 cv2.putText(image, fb, (int(image_width * 0.05), int(image_height * 0.15 + i * 0.05)), 
                             cv2.FONT_HERSHEY_SIMPLEX, 1, WHITE, 2, cv2.LINE_AA)
+            # Landmarks and text overlay together
+            STAGE_SECONDS.labels(stage="draw").observe(drawn_at - inferred_at + time.perf_counter() - analysed_at)
 
+        shown_at = time.perf_counter()
         cv2.imshow("State-of-the-Art Gym Training", image)
         key = cv2.waitKey(1) & 0xFF
+        STAGE_SECONDS.labels(stage="display").observe(time.perf_counter() - shown_at)
+        fps.mark()
         if key == ord('q'):
             if rep_count > 0:  # Save final reps if any
-                save_to_csv(exercise, rep_count, time.strftime("%Y-%m-%d %H:%M:%S"))
+                results_store.record(exercise, rep_count)
             break
 
     cap.release()
     cv2.destroyAllWindows()
+    results_store.close()
+    if recorder is not None:
+        recorder.close()
+        print(f"Saved {recorder.count} frames to {record_path}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""Replays recorded landmark streams through the exercise analysis.
+
+Recordings are produced by ``pose_estimation.py <file>.npy`` or by
+batch_analysis.py. Replay runs smoothing, analyze_exercise and the rep state
+machine without a camera or a pose model, so thresholds can be tuned and
+sessions re-scored at NumPy speed.
+
+    python replay.py batch_results/*.landmarks.npy --exercise Squat
+"""
+import argparse
+import collections
+import concurrent.futures
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from healthgenix.recording import load_recording
+from healthgenix.smoothing import KeypointSmoother
+from pose_estimation import analyze_exercise, rules, update_rep_state
+
+
+def replay(path, exercise):
+    """Scores one recording and returns rep events, per-frame feedback and a feedback tally."""
+    timestamps, landmarks = load_recording(path)
+    # Raw angles for the rep counter, computed for the whole session at once
+    angles = rules.compute_angles(landmarks)
+    detected = ~np.isnan(landmarks[:, 0, 0])
+
+    smoother = KeypointSmoother()
+    state = "up"
+    reps, feedback = [], []
+    for i in range(len(timestamps)):
+        if not detected[i]:
+            feedback.append([])
+            continue
+        feedback.append(analyze_exercise(None, landmarks[i], exercise, smoother))
+        state, rep_completed = update_rep_state(exercise, angles[i], state)
+        if rep_completed:
+            reps.append({"frame": i, "timestamp": float(timestamps[i]), "rep": len(reps) + 1})
+
+    return {
+        "recording": path,
+        "exercise": exercise,
+        "frames": len(timestamps),
+        "frames_with_pose": int(detected.sum()),
+        "reps": reps,
+        "feedback": feedback,
+        "feedback_counts": dict(collections.Counter(fb for frame in feedback for fb in frame)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score landmark recordings without running the pose model.")
+    parser.add_argument("recordings", nargs="+", help="recording files (.npy)")
+    parser.add_argument("--exercise", default="Squat", help="exercise performed in the recordings")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    with concurrent.futures.ProcessPoolExecutor(args.workers) as pool:
+        for result in pool.map(replay, args.recordings, [args.exercise] * len(args.recordings)):
+            print(f"{result['recording']}: {len(result['reps'])} reps, "
+                  f"{result['frames_with_pose']}/{result['frames']} frames with pose, "
+                  f"feedback {result['feedback_counts']}")
+
+
+if __name__ == "__main__":
+    main()
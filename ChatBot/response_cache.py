@@ -0,0 +1,116 @@
+"""Cache for chatbot replies with TTL, LRU eviction and coalescing of identical in-flight requests."""
+import asyncio
+import collections
+import hashlib
+import re
+import threading
+import time
+
+
+def normalize_message(text):
+    """Lowercases, collapses whitespace and drops trailing punctuation."""
+    return re.sub(r"\s+", " ", text.lower()).strip().rstrip("?!. ")
+
+
+def history_fingerprint(history):
+    """Hash of every (role, text) pair of a formatted Gemini history.
+
+    The whole conversation goes in: anything said earlier (an injury, a
+    condition, a session summary) may shape the reply, so two requests only
+    share a reply when their histories match.
+    """
+    digest = hashlib.sha1()
+    for message in history:
+        digest.update(message["role"].encode())
+        for part in message["parts"]:
+            digest.update(b"\0" + normalize_message(part["text"]).encode())
+        digest.update(b"\1")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """Maps (bot, normalized message, history fingerprint) to a reply.
+
+    Entries expire after ttl seconds and the least recently used entry is
+    evicted beyond max_entries. While a reply is being generated, other
+    requests with the same key wait for it instead of calling the model.
+    """
+
+    def __init__(self, max_entries=512, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = collections.Counter()
+        self._entries = collections.OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(bot, message, history):
+        return bot, normalize_message(message), history_fingerprint(history)
+
+    def get(self, key):
+        """Returns the live cached value for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        # Called with self._lock held
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    async def get_or_compute(self, key, compute):
+        """Returns the cached value for key, or awaits compute() once for all concurrent callers."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+                self.stats["expired"] += 1
+            task = self._inflight.get(key)
+            if task is None:
+                task = self._inflight[key] = asyncio.get_running_loop().create_task(self._compute(key, compute))
+                # Retrieved here so an error nobody waited for is not logged
+                task.add_done_callback(lambda done: done.cancelled() or done.exception())
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        # The call runs in its own task: any caller giving up (e.g. a disconnected client)
+        # leaves it running for the others, and its result is still cached
+        return await asyncio.shield(task)
+
+    async def _compute(self, key, compute):
+        try:
+            value = await compute()
+        except BaseException:
+            # Errors are passed to the waiters but never cached
+            with self._lock:
+                del self._inflight[key]
+            raise
+        with self._lock:
+            del self._inflight[key]
+            self._store(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def describe(self):
+        with self._lock:
+            return {"entries": len(self._entries), "inflight": len(self._inflight), **self.stats}
@@ -1,107 +1,508 @@
-from flask import Flask, Response, jsonify, request
+from flask import Flask, Response, g, jsonify, request
+import atexit
+import concurrent.futures
 import cv2
 import mediapipe as mp
 import numpy as np
+import contextlib
 import csv
-import pyttsx3
+import itertools
+import os
+import sys
+import threading
 import time
+import types
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from healthgenix.broadcast import FrameBroadcaster
+from healthgenix.encoding import AdaptiveQuality, JpegEncoder
+from healthgenix.exercises import RuleEngine, find_exercise
+from healthgenix.governor import PoseGovernor
+from healthgenix.landmark_stream import LandmarkDeltaEncoder
+from healthgenix.metrics import CONTENT_TYPE, PROFILER, REGISTRY
+from healthgenix.overlays import CorrectionOverlay, OverlayCache
+from healthgenix.pipeline import FramePipeline
+from healthgenix.results import ResultsStore
+from healthgenix.sessions import PoseService
+from healthgenix.speech import PRIORITY_HIGH, SpeechQueue
 
 app = Flask(__name__)
 mp_pose = mp.solutions.pose
 mp_drawing = mp.solutions.drawing_utils
-pose = mp_pose.Pose()
-engine = pyttsx3.init()
+speech = SpeechQueue()
+rules = RuleEngine()
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Set POSE_INFERENCE_EVERY=k to run the pose model on every k-th frame of a session (see InferenceScheduler)
+INFERENCE_EVERY = int(os.getenv("POSE_INFERENCE_EVERY", "1"))
+CAMERA_SESSION = "camera"
+# Set POSE_TARGET_FPS to give every session a governor that keeps up with that frame rate (see
+# PoseGovernor). Off by default: each governor holds up to three Pose graphs (lite, full and the
+# heavy model, which MediaPipe downloads on first use), roughly tripling memory per session.
+TARGET_FPS = float(os.getenv("POSE_TARGET_FPS", "0"))
+
+# Opened on first use or by the warm-up, so importing the app never touches the webcam
+cap = None
+camera_lock = threading.Lock()
 
-# Use laptop camera (index 0)
-cap = cv2.VideoCapture(0)
-exercise_name = "squat"
-rep_count = 0
-exercise_stage = None
+# The warm-up starts with the server or its first request, never on import; POSE_WARMUP=0 disables it
+WARMUP = os.getenv("POSE_WARMUP", "1") != "0"
+WARMUP_FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
 
 # Help image for squat correction
 help_images = {
     "squat": "help_squat.jpg"  # Ensure this file exists in the same directory
 }
+# Decoded once; shown over the stream for a few seconds when form stays poor
+correction = CorrectionOverlay(OverlayCache({name: os.path.join(APP_DIR, path) for name, path in help_images.items()}))
+
+# Finished sets, written to SQLite in the background (see healthgenix/results.py)
+results_store = ResultsStore(os.getenv("RESULTS_DB", os.path.join(APP_DIR, "workout_results.db")))
+
+# Per-step latency for /metrics; capture and JPEG times are recorded by the pipeline and JpegEncoder
+STAGE_SECONDS = REGISTRY.histogram("pose_stage_seconds", "Time spent in each step of analysing one frame.", ("stage",))
+REQUEST_SECONDS = REGISTRY.histogram("http_request_seconds", "Time to produce a response (streams: until they start).", ("route",))
+
+def speak(text, **kwargs):
+    speech.say(text, **kwargs)
+
+def detect_exercise(session, angles):
+    # Accuracy is the distance from the exercise's ideal angle (squat: knee ~100°)
+    definition = find_exercise(session.exercise)
+    if definition is None or definition.accuracy is None:
+        return 0
+    accuracy = rules.accuracy(session.exercise, angles)
+    if accuracy >= 70 and session.stage == "up":
+        session.rep_count += 1
+        session.rep_accuracy += accuracy
+        session.stage = "down"
+        if session.announce:
+            speak(f"{session.rep_count} {definition.name.lower()} completed", key="count")
+    elif accuracy < 50:
+        session.stage = "up"
+    return accuracy
+
+def finish_set(session):
+    # Store the reps done so far before they are reset or the session goes away
+    if session.rep_count:
+        accuracy = session.rep_accuracy / session.rep_count
+        results_store.record(session.exercise, session.rep_count, accuracy=accuracy, user=session.user)
+
+def analyze_frame(session, pose, frame):
+    """Runs on a pose worker: inference, rep counting and the session's result snapshot."""
+    start = time.perf_counter()
+    results = session.scheduler.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), pose)
+    inferred_at = time.perf_counter()
+    STAGE_SECONDS.labels(stage="inference" if results.inferred else "prediction").observe(inferred_at - start)
+    accuracy = 0
+    landmarks = ()
+    feedback = ()
+    angles = {}
+
+    if results.pose_landmarks:
+        joint_angles = rules.compute_angles(results.points)
+        accuracy = detect_exercise(session, joint_angles)
+        landmarks = tuple(map(tuple, results.points.tolist()))
+        angles = dict(zip(rules.angle_names, joint_angles.tolist()))
+    else:
+        feedback = ("No pose detected",)
+    if accuracy < 50 and landmarks:
+        feedback = ("Get ready, restarting exercise",)
+
+    session.results.publish(
+        exercise=session.exercise,
+        reps=session.rep_count,
+        accuracy=float(accuracy),
+        stage=session.stage,
+        feedback=feedback,
+        landmarks=landmarks,
+        angles=types.MappingProxyType(angles),
+    )
+    STAGE_SECONDS.labels(stage="analysis").observe(time.perf_counter() - inferred_at)
+    return results, accuracy
+
+# Every session gets its own Pose on the worker it is pinned to (see PoseService). When every
+# frame is inferred, tracking mode is the cheapest: MediaPipe crops around the previous landmarks
+# and only runs the person detector after losing track. When frames are skipped the session's
+# scheduler crops instead, and its moving crops need a static-mode model.
+TRACKING = INFERENCE_EVERY == 1
+pose_ids = itertools.count()
+
+def build_pose(complexity=1):
+    return mp_pose.Pose(static_image_mode=not TRACKING, model_complexity=complexity)
+
+def make_pose():
+    # Runs on the pose worker of the session the Pose is for
+    if not TARGET_FPS:
+        return build_pose()
+    name = f"{threading.current_thread().name}.{next(pose_ids)}"
+    return PoseGovernor(build_pose, TARGET_FPS, frames_per_inference=INFERENCE_EVERY, name=name)
+
+# Sessions are spread over a fixed pool of Pose workers (POSE_WORKERS, default: one per core),
+# each warmed up with one inference on a blank frame
+service = PoseService(
+    make_pose, analyze_frame,
+    workers=int(os.getenv("POSE_WORKERS", "0")) or None,
+    warmup_frame=WARMUP_FRAME,
+    # Closed and expired sessions (clients that just stop sending frames) keep their reps
+    on_close=finish_set,
+)
+camera_session = service.create_session(
+    "squat", session_id=CAMERA_SESSION, every=INFERENCE_EVERY, crop=not TRACKING, announce=True, persistent=True,
+)
+
+@atexit.register
+def save_open_sets():
+    # Sets still in progress when the server stops; registered after results_store, so it runs before the store closes
+    for session in service.sessions():
+        finish_set(session)
+
+def open_camera():
+    global cap
+    with camera_lock:
+        if cap is None:
+            # Use laptop camera (index 0)
+            cap = cv2.VideoCapture(0)
+    return cap
+
+def capture_frame():
+    ret, frame = open_camera().read()
+    if not ret:
+        print("Failed to capture frame from camera")
+        return None
+    return frame
+
+def annotate_frame(frame):
+    outcome = service.submit(CAMERA_SESSION, frame).result()
+    if outcome is None:
+        # Superseded by a newer camera frame
+        return None
+    results, accuracy = outcome
+    if not broadcaster.viewers:
+        # Only landmark-stream clients: they draw their own overlay
+        return None
+    image = frame
+    start = time.perf_counter()
+
+    if results.pose_landmarks:
+        mp_drawing.draw_landmarks(image, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+        
+    if correction.update(camera_session.exercise, accuracy < 50) == "ended":
+        speak("Get ready, restarting exercise", priority=PRIORITY_HIGH)
+    correction.draw(image)
+
+    cv2.putText(image, f'Reps: {camera_session.rep_count}', (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+    cv2.putText(image, f'Accuracy: {int(accuracy)}%', (50, 140), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+    STAGE_SECONDS.labels(stage="draw").observe(time.perf_counter() - start)
+    return image
+
+def start_pipeline():
+    return FramePipeline(
+        ("capture", capture_frame),
+        ("inference", annotate_frame),
+    ).start()
+
+# One capture -> inference pipeline shared by every /video_feed and /landmark_feed client
+broadcaster = FrameBroadcaster(start_pipeline)
+# Annotated frames are JPEG-encoded per quality level, shared by clients on the same level
+jpeg = JpegEncoder()
+
+# /squat_data clients poll instead of streaming; each poll keeps the camera pipeline running
+# for POLL_LINGER more seconds, so back-to-back polls don't stop and restart it
+POLL_LINGER = float(os.getenv("POLL_LINGER", "5"))
+poll_until = 0.0
+poll_thread = None
+poll_lock = threading.Lock()
+
+def hold_for_pollers():
+    global poll_thread
+    with broadcaster.hold():
+        while True:
+            with poll_lock:
+                remaining = poll_until - time.monotonic()
+                if remaining <= 0:
+                    poll_thread = None
+                    return
+            time.sleep(remaining)
+
+def keep_camera_running():
+    """Extends the pollers' hold on the camera pipeline; returns True if it had lapsed."""
+    global poll_until, poll_thread
+    with poll_lock:
+        poll_until = time.monotonic() + POLL_LINGER
+        if poll_thread is not None:
+            return False
+        poll_thread = threading.Thread(target=hold_for_pollers, name="poll-hold", daemon=True)
+        poll_thread.start()
+        return True
 
-def speak(text):
-    engine.say(text)
-    engine.runAndWait()
-
-def calculate_angle(a, b, c):
-    a, b, c = np.array(a), np.array(b), np.array(c)
-    ba, bc = a - b, c - b
-    cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-    return np.degrees(np.arccos(cosine_angle))
-
-def detect_exercise(landmarks, exercise):
-    global rep_count, exercise_stage
-    
-    shoulder = [landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].x, landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-    hip = [landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].x, landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].y]
-    knee = [landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value].x, landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value].y]
-    ankle = [landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value].x, landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value].y]
-    
-    if exercise == "squat":
-        knee_angle = calculate_angle(hip, knee, ankle)
-        accuracy = max(0, 100 - abs(knee_angle - 100))  # Ideal squat angle ~100°
-        if accuracy >= 70 and exercise_stage == "up":
-            rep_count += 1
-            exercise_stage = "down"
-            speak(f"{rep_count} squat completed")
-        elif accuracy < 50:
-            exercise_stage = "up"
-        return accuracy
-    
-    return 0
-
-def generate_frames():
-    global exercise_name
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Failed to capture frame from camera")
-            break
-
-        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = pose.process(image)
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-        accuracy = 0
-
-        if results.pose_landmarks:
-            accuracy = detect_exercise(results.pose_landmarks.landmark, exercise_name)
-            mp_drawing.draw_landmarks(image, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
-            
-        if accuracy < 50:
-            help_img = cv2.imread(help_images[exercise_name])
-            if help_img is not None:
-                cv2.imshow("Correction", help_img)
-                time.sleep(5)
-                cv2.destroyWindow("Correction")
-                speak("Get ready, restarting exercise")
-            else:
-                print("Help image not found:", help_images[exercise_name])
-
-        cv2.putText(image, f'Reps: {rep_count}', (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        cv2.putText(image, f'Accuracy: {int(accuracy)}%', (50, 140), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
-        _, buffer = cv2.imencode('.jpg', image)
-        frame_bytes = buffer.tobytes()
-        yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+def warm_up():
+    # Loads the pose models, speech engine and camera in the background; /ready reports progress
+    service.start()
+    speech.start()
+    open_camera()
+    jpeg.encode(WARMUP_FRAME)
+    service.wait_ready()
+
+warmup_thread = None
+warmup_lock = threading.Lock()
+
+def start_warm_up():
+    global warmup_thread
+    with warmup_lock:
+        if warmup_thread is None:
+            warmup_thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+            warmup_thread.start()
+
+def generate_frames(max_width=None):
+    # Each client's quality and size follow how long its sends block (see AdaptiveQuality)
+    quality = None
+    last_frame_at = None
+    for image in broadcaster.subscribe():
+        if quality is None:
+            min_level = jpeg.level_for_width(image.shape[1], max_width) if max_width else 0
+            quality = AdaptiveQuality(len(jpeg.levels), min_level=min_level)
+        frame_bytes = jpeg.encode(image, quality.level)
+        yield b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+        sent_at = time.perf_counter()
+        yield frame_bytes
+        now = time.perf_counter()
+        if last_frame_at is not None:
+            quality.record(now - sent_at, now - last_frame_at)
+        last_frame_at = now
+        yield b'\r\n'
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    # ?max_width=<pixels> caps the resolution for small screens
+    return Response(generate_frames(request.args.get("max_width", type=int)), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+def collect_metrics():
+    # Values tracked elsewhere, read at scrape time
+    pipeline = broadcaster.pipeline.stats() if broadcaster.pipeline is not None else {"stages": {}, "fps": 0}
+    stages = pipeline["stages"]
+    broadcast = broadcaster.stats()
+    sessions = service.describe()
+    return [
+        ("pipeline_output_fps", "gauge", "Frames per second leaving the camera pipeline.", [({}, pipeline["fps"])]),
+        ("pipeline_queue_depth", "gauge", "Items waiting after each pipeline stage.",
+         [({"stage": name}, stage["queue_depth"]) for name, stage in stages.items()]),
+        ("pipeline_dropped_frames", "counter", "Frames dropped after each stage by a full queue.",
+         [({"stage": name}, stage["dropped"]) for name, stage in stages.items()]),
+        ("broadcast_clients", "gauge", "Clients of the camera pipeline.",
+         [({"kind": "subscribers"}, broadcast["subscribers"]), ({"kind": "viewers"}, broadcast["viewers"])]),
+        ("broadcast_frames", "counter", "Frames published to, and skipped by, video clients.",
+         [({"outcome": "published"}, broadcast["published"]), ({"outcome": "skipped"}, broadcast["skipped"])]),
+        ("pose_sessions", "gauge", "Open pose sessions.", [({}, sessions["sessions"])]),
+        ("pose_queue_depth", "gauge", "Sessions waiting for a pose worker.", [({}, sessions["queued"])]),
+        ("pose_frames", "counter", "Session frames processed or superseded before processing.",
+         [({"outcome": key}, sessions.get(key, 0)) for key in ("processed", "superseded")]),
+        ("jpeg_frames", "counter", "Video frames encoded, or served from the per-level cache.",
+         [({"outcome": key}, jpeg.stats[key]) for key in ("encoded", "reused")]),
+        ("speech_queue_depth", "gauge", "Announcements waiting to be spoken.", [({}, len(speech))]),
+        ("speech_skipped", "counter", "Announcements replaced by a newer one before being spoken.", [({}, speech.skipped)]),
+    ]
+
+REGISTRY.collector("freetrail", collect_metrics)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+    # Under a WSGI server the first request (often a /ready probe) starts the warm-up
+    if WARMUP and warmup_thread is None:
+        start_warm_up()
+
+@app.after_request
+def record_request_time(response):
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    REQUEST_SECONDS.labels(route=route).observe(time.perf_counter() - g.request_start)
+    return response
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    # 200 once every pose worker has loaded its model and run a warm-up inference, 503 until then
+    workers = service.describe()
+    status = {
+        "ready": service.ready,
+        "workers": workers["workers"],
+        "warm_workers": workers["warm_workers"],
+        "errors": service.errors,
+        "camera": cap is not None and cap.isOpened(),
+    }
+    return jsonify(status), 200 if status["ready"] else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@app.route('/profiler', methods=['GET', 'POST'])
+def profiler():
+    # POST {"enabled": true, "interval": 0.005} starts sampling, {"enabled": false} stops it;
+    # GET returns the folded stacks collected so far, for flame graph tools
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        return jsonify(PROFILER.toggle(bool(data.get("enabled")), data.get("interval")))
+    return Response(PROFILER.folded(), mimetype='text/plain')
+
+@app.route('/pipeline_stats', methods=['GET'])
+def pipeline_stats():
+    stats = broadcaster.pipeline.stats() if broadcaster.pipeline is not None else {}
+    stats["broadcast"] = broadcaster.stats()
+    stats["jpeg"] = dict(jpeg.stats)
+    return jsonify(stats)
+
+def snapshot_response(store):
+    # Served from the latest snapshot; never touches the camera or model.
+    # ?wait=<seconds> long-polls for a result newer than ?since=<version> or If-None-Match.
+    etag = request.headers.get("If-None-Match", "").strip('W/"')
+    since = request.args.get("since", type=int, default=int(etag) if etag.isdigit() else None)
+    wait = min(request.args.get("wait", type=float, default=0), 30)
+
+    snapshot = store.latest
+    if wait > 0 and since is not None:
+        snapshot = store.wait_newer(since, wait)
+    if since is not None and snapshot.version == since:
+        response = Response(status=304)
+    else:
+        response = jsonify({
+            "count": snapshot.reps,
+            "accuracy": int(snapshot.accuracy),
+            "exercise": snapshot.exercise,
+            "stage": snapshot.stage,
+            "feedback": list(snapshot.feedback),
+            "landmarks": snapshot.landmarks,
+            "angles": dict(snapshot.angles),
+            "timestamp": snapshot.timestamp,
+            "version": snapshot.version,
+        })
+    response.set_etag(str(snapshot.version))
+    return response
+
+def generate_landmarks(store, hold=contextlib.nullcontext):
+    # Server-sent events, one delta-encoded message per analysed frame (see landmark_stream)
+    encoder = LandmarkDeltaEncoder()
+    version = store.latest.version
+    with hold():
+        while True:
+            snapshot = store.wait_newer(version, 15)
+            if snapshot.version == version:
+                yield b': keepalive\n\n'
+                continue
+            version = snapshot.version
+            yield b'data: ' + encoder.encode(snapshot) + b'\n\n'
+
+def landmark_response(stream):
+    return Response(stream, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/landmark_feed')
+def landmark_feed():
+    # Keeps the camera pipeline running without drawing or JPEG-encoding for this client
+    return landmark_response(generate_landmarks(camera_session.results, broadcaster.hold))
 
 @app.route('/set_exercise', methods=['POST'])
 def set_exercise():
-    global exercise_name, rep_count
     data = request.json
-    exercise_name = data.get("exercise", "squat")
-    rep_count = 0
-    return jsonify({"message": "Exercise updated successfully", "exercise": exercise_name})
+    finish_set(camera_session)
+    camera_session.set_exercise(data.get("exercise", "squat"))
+    return jsonify({"message": "Exercise updated successfully", "exercise": camera_session.exercise})
 
 @app.route('/squat_data', methods=['GET'])
 def get_squat_data():
-    return jsonify({"count": rep_count, "accuracy": int(detect_exercise(pose.process(cv2.cvtColor(cap.read()[1], cv2.COLOR_BGR2RGB)).pose_landmarks.landmark if pose.process(cv2.cvtColor(cap.read()[1], cv2.COLOR_BGR2RGB)).pose_landmarks else 0, "squat"))})
+    # Runs the camera pipeline itself, so polling works without a /video_feed or /landmark_feed client
+    store = camera_session.results
+    with broadcaster.hold():
+        if keep_camera_running() and "wait" not in request.args:
+            # The pipeline was idle: answer with a freshly analysed frame, not a stale snapshot
+            store.wait_newer(store.latest.version, 5)
+        return snapshot_response(store)
+
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    data = request.get_json(silent=True) or {}
+    session = service.create_session(
+        data.get("exercise", "squat"), every=INFERENCE_EVERY, crop=not TRACKING, user=data.get("user", "local"),
+    )
+    return jsonify({"session_id": session.id, "exercise": session.exercise}), 201
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def close_session(session_id):
+    if session_id == CAMERA_SESSION or not service.close_session(session_id):
+        return jsonify({"error": "Session not found."}), 404
+    return jsonify({"message": "Session closed"})
+
+@app.route('/sessions/<session_id>/exercise', methods=['POST'])
+def set_session_exercise(session_id):
+    session = service.get_session(session_id)
+    if session is None:
+        return jsonify({"error": "Session not found."}), 404
+    finish_set(session)
+    session.set_exercise((request.get_json(silent=True) or {}).get("exercise", "squat"))
+    return jsonify({"message": "Exercise updated successfully", "exercise": session.exercise})
+
+@app.route('/sessions/<session_id>/frame', methods=['POST'])
+def submit_frame(session_id):
+    # Body is one JPEG-encoded camera frame from the client
+    session = service.get_session(session_id)
+    if session is None:
+        return jsonify({"error": "Session not found."}), 404
+    frame = cv2.imdecode(np.frombuffer(request.get_data(), dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        return jsonify({"error": "Could not decode frame."}), 400
+    try:
+        service.submit(session_id, frame).result(timeout=5)
+    except concurrent.futures.TimeoutError:
+        pass
+    return snapshot_response(session.results)
+
+@app.route('/sessions/<session_id>/data', methods=['GET'])
+def get_session_data(session_id):
+    session = service.get_session(session_id)
+    if session is None:
+        return jsonify({"error": "Session not found."}), 404
+    return snapshot_response(session.results)
+
+@app.route('/sessions/<session_id>/landmarks', methods=['GET'])
+def session_landmarks(session_id):
+    session = service.get_session(session_id)
+    if session is None:
+        return jsonify({"error": "Session not found."}), 404
+    return landmark_response(generate_landmarks(session.results))
+
+@app.route('/sessions/stats', methods=['GET'])
+def session_stats():
+    return jsonify(service.describe())
+
+@app.route('/pose_quality', methods=['GET'])
+def pose_quality():
+    # Each session's model and input size, and its recent switches
+    governors = []
+    for session in service.sessions():
+        pose = session.pose
+        if isinstance(pose, PoseGovernor):
+            governors.append(dict(pose.describe(), session=session.id))
+    return jsonify({"target_fps": TARGET_FPS, "governors": governors})
+
+def result_filters():
+    return {
+        "user": request.args.get("user"),
+        "exercise": request.args.get("exercise"),
+        "since": request.args.get("since", type=float),
+        "until": request.args.get("until", type=float),
+    }
+
+@app.route('/results', methods=['GET'])
+def results_history():
+    # Newest first; filter with ?user=, ?exercise=, ?since= and ?until= (Unix seconds)
+    limit = min(request.args.get("limit", type=int, default=100), 1000)
+    return jsonify(results_store.history(limit=limit, **result_filters()))
+
+@app.route('/results/summary', methods=['GET'])
+def results_summary():
+    return jsonify(results_store.aggregates(**result_filters()))
 
 if __name__ == '__main__':
+    # debug=True also runs this module in the reloader's watcher process; only the serving child warms up
+    if WARMUP and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_warm_up()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
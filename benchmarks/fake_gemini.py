@@ -0,0 +1,62 @@
+"""Local stand-in for the Gemini REST API, for load-testing the chat service.
+
+Answers generateContent and streamGenerateContent (alt=sse) after a fixed
+delay with a canned reply, and counts the calls it receives. GET on a model
+returns its metadata, as used by the chat service's warm-up.
+
+    python benchmarks/fake_gemini.py --port 8765 --latency 0.5
+    GEMINI_BASE_URL=http://127.0.0.1:8765/v1beta python ChatBot/app.py
+"""
+import argparse
+import asyncio
+import collections
+import json
+
+from quart import Quart, Response, request
+
+REPLY = "**Plan**\n* Warm up for 5 minutes\n* Three sets of 10 squats\n- Stretch afterwards."
+
+app = Quart(__name__)
+app.config["LATENCY"] = 0.2
+app.config["CHUNKS"] = 4
+calls = collections.Counter()
+
+
+def candidate(text):
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+
+@app.route("/v1beta/models/<model>", methods=["GET"])
+async def model_info(model):
+    return {"name": f"models/{model}", "supportedGenerationMethods": ["generateContent", "streamGenerateContent"]}
+
+
+@app.route("/v1beta/models/<path:target>", methods=["POST"])
+async def generate(target):
+    model, _, method = target.partition(":")
+    body = await request.get_json()
+    calls[method] += 1
+    reply = f"{REPLY}\n({model}, {len(body['contents'])} messages)"
+    latency = app.config["LATENCY"]
+    if method == "generateContent":
+        await asyncio.sleep(latency)
+        return candidate(reply)
+
+    size = -(-len(reply) // app.config["CHUNKS"])
+    chunks = [reply[i:i + size] for i in range(0, len(reply), size)]
+
+    async def events():
+        for chunk in chunks:
+            await asyncio.sleep(latency / len(chunks))
+            yield f"data: {json.dumps(candidate(chunk))}\r\n\r\n"
+
+    return Response(events(), mimetype="text/event-stream")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake Gemini API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per reply")
+    args = parser.parse_args()
+    app.config["LATENCY"] = args.latency
+    app.run(host="127.0.0.1", port=args.port)
@@ -0,0 +1,276 @@
+"""Benchmarks for the pose and chat hot paths on synthetic data.
+
+Runs on a CPU-only machine with no camera: landmark streams come from
+synthetic.py and mp_pose.Pose is replaced by StubPose, so only our own code
+is measured. Each benchmark reports throughput and per-call latency
+percentiles; the long-session benchmark also reports memory growth.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --json current.json --baseline previous.json
+
+With --baseline, exits non-zero when a benchmark's p50 latency regresses by
+more than --tolerance.
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import socket
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "ChatBot"))
+from healthgenix.kinematics import calculate_angle, default_engine
+from healthgenix.smoothing import KeypointSmoother
+from synthetic import EXERCISE_RANGES, StubPose, synthetic_stream
+
+SAMPLE_REPLY = "\n".join(
+    ["**Knee Rehabilitation Plan**", "* **Warm-up:**"]
+    + [f"* Step {i}: hold the stretch for 30 seconds and repeat *slowly*" for i in range(20)]
+    + ["- Avoid deep squats until cleared by your physiotherapist.", "• Ice the knee after exercise."]
+)
+
+
+def measure(func, iterations, warmup=10):
+    """Calls func(i) repeatedly and returns throughput and latency percentiles."""
+    for i in range(warmup):
+        func(i)
+    samples = np.empty(iterations)
+    start = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        func(i)
+        samples[i] = time.perf_counter() - t0
+    elapsed = time.perf_counter() - start
+    p50, p95, p99 = (float(p) for p in np.percentile(samples, [50, 95, 99]) * 1e6)
+    return {
+        "calls_per_s": round(iterations / elapsed, 1),
+        "p50_us": round(p50, 2),
+        "p95_us": round(p95, 2),
+        "p99_us": round(p99, 2),
+    }
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bench_calculate_angle(points, exercise, iterations):
+    frame = points[0]
+    return measure(lambda i: calculate_angle(frame[23, :2], frame[25, :2], frame[27, :2]), iterations)
+
+
+def bench_joint_angles(points, exercise, iterations):
+    return measure(lambda i: default_engine.compute(points[i % len(points)]), iterations)
+
+
+def bench_joint_angles_batch(points, exercise, iterations):
+    result = measure(lambda i: default_engine.compute(points), max(1, iterations // 100))
+    result["frames_per_s"] = round(result["calls_per_s"] * len(points), 1)
+    return result
+
+
+def bench_smoother(points, exercise, iterations):
+    smoother = KeypointSmoother()
+    return measure(lambda i: smoother.update(points[i % len(points)]), iterations)
+
+
+def bench_analyze_exercise(points, exercise, iterations):
+    import pose_estimation
+
+    smoother = KeypointSmoother()
+    return measure(lambda i: pose_estimation.analyze_exercise(None, points[i % len(points)], exercise, smoother), iterations)
+
+
+def bench_rep_state_machine(points, exercise, iterations):
+    import pose_estimation
+
+    angles = pose_estimation.rules.compute_angles(points)
+    state = ["up"]
+
+    def step(i):
+        state[0], _ = pose_estimation.update_rep_state(exercise, angles[i % len(angles)], state[0])
+
+    return measure(step, iterations)
+
+
+def bench_frame_analysis(points, exercise, iterations):
+    """Everything main() does per frame after inference: convert, smooth, analyze, count."""
+    import pose_estimation
+    from healthgenix.kinematics import landmarks_to_array
+
+    pose = StubPose(points=points)
+    smoother = KeypointSmoother()
+    state = ["up"]
+
+    def step(i):
+        landmarks = pose.process(None).pose_landmarks.landmark
+        frame_points = landmarks_to_array(landmarks)
+        angles = pose_estimation.rules.compute_angles(frame_points)
+        pose_estimation.analyze_exercise(None, frame_points, exercise, smoother)
+        state[0], _ = pose_estimation.update_rep_state(exercise, angles, state[0])
+
+    return measure(step, iterations)
+
+
+def bench_annotate_and_encode(points, exercise, iterations):
+    """generate_frames drawing and JPEG encoding with the model stubbed out."""
+    import mediapipe as mp
+
+    mp.solutions.pose.Pose = lambda *args, **kwargs: StubPose(points=points)
+    # No camera or background warm-up; the benchmark drives annotate_frame directly
+    os.environ["POSE_WARMUP"] = "0"
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = load_module("freetrail_app", os.path.join(ROOT, "FreetrailPoseEstimation", "app.py"))
+    frame = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    # The stub ignores crops, so keep the scheduler on full frames
+    app.camera_session.scheduler.max_roi_fraction = 0.0
+    # Draw as if a /video_feed client were connected
+    app.broadcaster._viewers = 1
+
+    def step(i):
+        with contextlib.redirect_stdout(io.StringIO()):
+            app.jpeg.encode(app.annotate_frame(frame.copy()))
+
+    result = measure(step, iterations)
+    result["fps"] = result["calls_per_s"]
+    return result
+
+
+def bench_format_response(points, exercise, iterations):
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    chat_app = load_module("chat_app", os.path.join(ROOT, "ChatBot", "app.py"))
+    return measure(lambda i: chat_app.format_response(SAMPLE_REPLY), iterations)
+
+
+def bench_chat_concurrency(points, exercise, iterations, requests=64, latency=0.2):
+    """Concurrent /ask requests against fake_gemini.py, so upstream waits overlap as they would in production."""
+    import fake_gemini
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ["GEMINI_BASE_URL"] = f"http://127.0.0.1:{port}/v1beta"
+    chat_app = load_module("chat_app_concurrency", os.path.join(ROOT, "ChatBot", "app.py"))
+    fake_gemini.app.config["LATENCY"] = latency
+
+    async def run():
+        stop = asyncio.Event()
+        server = asyncio.create_task(fake_gemini.app.run_task(host="127.0.0.1", port=port, shutdown_trigger=stop.wait))
+        while True:
+            try:
+                await asyncio.open_connection("127.0.0.1", port)
+                break
+            except OSError:
+                await asyncio.sleep(0.05)
+        client = chat_app.app.test_client()
+        start = time.perf_counter()
+        # Distinct questions, so every request goes upstream
+        responses = await asyncio.gather(*(client.post("/ask", json={"message": f"question {i}"}) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+        await chat_app.client.aclose()
+        stop.set()
+        await server
+        return elapsed, sum(response.status_code != 200 for response in responses)
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        elapsed, errors = asyncio.run(run())
+    return {
+        "requests": requests,
+        "upstream_latency_s": latency,
+        "bot_concurrency": chat_app.BOT_CONCURRENCY,
+        "requests_per_s": round(requests / elapsed, 1),
+        "errors": errors,
+    }
+
+
+def bench_session_memory(points, exercise, iterations, session_frames=36000):
+    """Runs a 20-minute session at 30 fps through the analysis and reports memory growth."""
+    import pose_estimation
+
+    smoother = KeypointSmoother()
+    tracemalloc.start()
+    checkpoints = []
+    start = time.perf_counter()
+    for i in range(session_frames):
+        pose_estimation.analyze_exercise(None, points[i % len(points)], exercise, smoother)
+        if i in (1000, session_frames - 1):
+            checkpoints.append(tracemalloc.get_traced_memory()[0])
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    return {
+        "fps": round(session_frames / elapsed, 1),
+        "memory_growth_kb": round((checkpoints[1] - checkpoints[0]) / 1024, 1),
+    }
+
+
+BENCHMARKS = {
+    "calculate_angle": bench_calculate_angle,
+    "joint_angles": bench_joint_angles,
+    "joint_angles_batch": bench_joint_angles_batch,
+    "smoother": bench_smoother,
+    "analyze_exercise": bench_analyze_exercise,
+    "rep_state_machine": bench_rep_state_machine,
+    "frame_analysis": bench_frame_analysis,
+    "annotate_and_encode": bench_annotate_and_encode,
+    "format_response": bench_format_response,
+    "chat_concurrency": bench_chat_concurrency,
+    "session_memory": bench_session_memory,
+}
+
+
+def compare(results, baseline, tolerance):
+    """Returns the names of benchmarks whose p50 latency regressed beyond tolerance."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name, {}).get("p50_us")
+        if before and "p50_us" in result and result["p50_us"] > before * (1 + tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pose and chat hot paths on synthetic data.")
+    parser.add_argument("--iterations", type=int, default=2000, help="timed calls per benchmark")
+    parser.add_argument("--exercise", default="Squat", choices=sorted(EXERCISE_RANGES), help="synthetic stream to use")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="run a subset of benchmarks")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p50 slowdown versus baseline")
+    args = parser.parse_args()
+
+    _, points = synthetic_stream(args.exercise, frames=900)
+    results = {}
+    for name in args.only or BENCHMARKS:
+        try:
+            results[name] = BENCHMARKS[name](points, args.exercise, args.iterations)
+        except ImportError as e:
+            # e.g. mediapipe or the Gemini SDK missing on this host
+            results[name] = {"skipped": str(e)}
+        print(f"{name:22s} {results[name]}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        if regressions:
+            print("Regressions:", ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
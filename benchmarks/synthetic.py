@@ -0,0 +1,98 @@
+"""Synthetic pose streams and a stand-in for mp_pose.Pose.
+
+Streams are side-view skeletons whose joints follow a smooth rep cycle, so
+the exercise logic sees realistic angle ranges and counts reps, without a
+camera or a model.
+"""
+import types
+
+import numpy as np
+
+from healthgenix.kinematics import (
+    LEFT_ANKLE, LEFT_ELBOW, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, LEFT_WRIST,
+    NUM_LANDMARKS,
+)
+
+SHIN, THIGH, TORSO, UPPER_ARM, FOREARM = 0.2, 0.2, 0.3, 0.15, 0.14
+
+# Per exercise: (knee angle, shin tilt, torso lean, elbow angle) at the top and bottom of a rep
+EXERCISE_RANGES = {
+    "Squat": ((170, 0, 10, 170), (80, 30, 40, 170)),
+    "Deadlift": ((175, 0, 0, 175), (150, 10, 90, 175)),
+    "Bicep Curls": ((175, 0, 0, 170), (175, 0, 0, 35)),
+}
+
+
+def _direction(degrees_from_vertical):
+    """Unit vectors pointing up and rotated forward (+x) by the given angle."""
+    radians = np.radians(degrees_from_vertical)
+    return np.stack([np.sin(radians), -np.cos(radians)], axis=-1)
+
+
+def side_view_pose(knee_angle, shin_tilt, torso_lean, elbow_angle):
+    """Builds (N, 33, 4) landmarks from per-frame joint parameters in degrees."""
+    n = len(knee_angle)
+    points = np.zeros((n, NUM_LANDMARKS, 4), dtype=np.float32)
+    ankle = np.tile([0.5, 0.9], (n, 1))
+    knee = ankle + SHIN * _direction(shin_tilt)
+    # The thigh leaves the knee backwards, knee_angle away from the shin
+    hip = knee + THIGH * _direction(180 + shin_tilt + knee_angle)
+    shoulder = hip + TORSO * _direction(torso_lean)
+    # Upper arm hangs straight down; the forearm opens forward by elbow_angle
+    elbow = shoulder + UPPER_ARM * _direction(np.full(n, 180.0))
+    wrist = elbow + FOREARM * _direction(elbow_angle)
+
+    joints = {LEFT_ANKLE: ankle, LEFT_KNEE: knee, LEFT_HIP: hip, LEFT_SHOULDER: shoulder, LEFT_ELBOW: elbow, LEFT_WRIST: wrist}
+    # Face, hands and feet sit next to the joint they belong to
+    attached = {LEFT_SHOULDER: range(0, 11), LEFT_WRIST: range(17, 23), LEFT_ANKLE: range(29, 33)}
+    for index, xy in joints.items():
+        points[:, index, :2] = xy
+        points[:, index + 1, :2] = xy + [0.02, 0.0]  # right side, slightly offset
+    for anchor, indices in attached.items():
+        for index in indices:
+            points[:, index, :2] = joints[anchor] + [0.01 * (index % 3), -0.12 if anchor == LEFT_SHOULDER else 0.01]
+    points[:, :, 3] = 0.99
+    return points
+
+
+def synthetic_stream(exercise="Squat", frames=900, fps=30.0, reps_per_minute=20.0, noise=0.002, seed=0):
+    """Returns (timestamps, landmarks) for an exercise performed at a steady rep rate."""
+    timestamps = np.arange(frames) / fps
+    phase = 0.5 - 0.5 * np.cos(2 * np.pi * reps_per_minute / 60.0 * timestamps)
+    top, bottom = (np.array(p, dtype=np.float64) for p in EXERCISE_RANGES[exercise])
+    params = top + phase[:, None] * (bottom - top)
+    points = side_view_pose(*params.T)
+    rng = np.random.default_rng(seed)
+    points[:, :, :2] += rng.normal(0.0, noise, points[:, :, :2].shape).astype(np.float32)
+    return timestamps, points
+
+
+def _landmark_list(points):
+    """Wraps a (33, 4) array like MediaPipe's NormalizedLandmarkList."""
+    try:
+        from mediapipe.framework.formats import landmark_pb2
+    except ImportError:
+        landmarks = [types.SimpleNamespace(x=float(x), y=float(y), z=float(z), visibility=float(v)) for x, y, z, v in points]
+        return types.SimpleNamespace(landmark=landmarks)
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, v in points.tolist():
+        landmark_list.landmark.add(x=x, y=y, z=z, visibility=v)
+    return landmark_list
+
+
+class StubPose:
+    """Drop-in for mp_pose.Pose that replays a synthetic stream instead of running a model."""
+
+    def __init__(self, *args, points=None, **kwargs):
+        if points is None:
+            points = synthetic_stream()[1]
+        self._results = [types.SimpleNamespace(pose_landmarks=_landmark_list(p)) for p in points]
+        self._index = 0
+
+    def process(self, image):
+        result = self._results[self._index % len(self._results)]
+        self._index += 1
+        return result
+
+    def close(self):
+        pass
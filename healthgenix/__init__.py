@@ -0,0 +1 @@
+"""Shared building blocks for the HealthGenix Python services."""
@@ -0,0 +1,119 @@
+"""Single-producer broadcast of the latest frame to any number of subscribers."""
+import contextlib
+import threading
+
+
+class FrameBroadcaster:
+    """Runs one pipeline and shares its output with every subscriber.
+
+    pipeline_factory returns a started FramePipeline. It is created when the
+    first subscriber arrives and stopped once the last one leaves, so
+    inference and encoding happen once per frame however many clients watch.
+    Only the newest frame is kept; a slow subscriber skips to it instead of
+    queuing everything it missed.
+
+    hold() keeps the pipeline running for clients that only need its side
+    effects (e.g. analysis results) and not the frames; viewers counts the
+    clients actually receiving frames, so stages can skip drawing and
+    encoding when there are none.
+    """
+
+    def __init__(self, pipeline_factory, idle_timeout=1.0):
+        self.pipeline_factory = pipeline_factory
+        self.idle_timeout = idle_timeout
+        self.pipeline = None
+        self.published = 0
+        self.skipped = 0
+        self._frame = None
+        self._seq = 0
+        self._subscribers = 0
+        self._viewers = 0
+        self._producer = None
+        self._stopping = False
+        self._cond = threading.Condition()
+
+    @property
+    def subscribers(self):
+        return self._subscribers
+
+    @property
+    def viewers(self):
+        return self._viewers
+
+    def _produce(self, pipeline):
+        for frame in pipeline.frames():
+            with self._cond:
+                self._frame = frame
+                self._seq += 1
+                self.published += 1
+                self._cond.notify_all()
+        pipeline.stop()
+        with self._cond:
+            self._producer = None
+            # Someone subscribed while the idle pipeline was shutting down
+            if self._stopping and self._subscribers:
+                self._ensure_producer()
+            self._cond.notify_all()
+
+    def _ensure_producer(self):
+        # Called with self._cond held
+        if self._producer is None:
+            self._stopping = False
+            self.pipeline = self.pipeline_factory()
+            self._producer = threading.Thread(target=self._produce, args=(self.pipeline,), name="broadcast", daemon=True)
+            self._producer.start()
+
+    def _acquire(self):
+        # Called with self._cond held
+        self._subscribers += 1
+        self._ensure_producer()
+
+    def _release(self):
+        # Called with self._cond held
+        self._subscribers -= 1
+        if not self._subscribers and self._producer is not None:
+            self._stopping = True
+            self.pipeline.stop()
+
+    @contextlib.contextmanager
+    def hold(self):
+        """Keeps the pipeline running for the duration of the block without receiving frames."""
+        with self._cond:
+            self._acquire()
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self._release()
+
+    def subscribe(self):
+        """Yields frames as they are published until the stream ends."""
+        with self._cond:
+            self._acquire()
+            self._viewers += 1
+            last_seen = self._seq
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq != last_seen or self._producer is None, self.idle_timeout)
+                    if self._seq == last_seen:
+                        if self._producer is None:
+                            return
+                        continue
+                    self.skipped += self._seq - last_seen - 1
+                    last_seen = self._seq
+                    frame = self._frame
+                yield frame
+        finally:
+            with self._cond:
+                self._viewers -= 1
+                self._release()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "subscribers": self._subscribers,
+                "viewers": self._viewers,
+                "published": self.published,
+                "skipped": self.skipped,
+            }
@@ -0,0 +1,100 @@
+"""JPEG encoding for the video feed, adapted to each client's link."""
+import collections
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from healthgenix.metrics import REGISTRY
+
+# (JPEG quality, downscale factor), best first
+LEVELS = ((90, 1.0), (80, 1.0), (70, 0.75), (60, 0.6), (50, 0.5), (40, 0.4))
+
+ENCODE_SECONDS = REGISTRY.histogram("jpeg_encode_seconds", "Time to resize and JPEG-encode one frame, per quality level.", ("level",))
+
+
+class JpegEncoder:
+    """Encodes broadcast frames at a fixed ladder of quality levels.
+
+    Each frame is encoded at most once per level: clients on the same level
+    share the bytes, and a frame seen again at the same level is not
+    re-encoded. Downscaling writes into a buffer kept per level.
+    """
+
+    def __init__(self, levels=LEVELS):
+        self.levels = levels
+        self.stats = collections.Counter()
+        self._locks = [threading.Lock() for _ in levels]
+        self._buffers = [None] * len(levels)
+        self._cache = [(None, None)] * len(levels)
+
+    def level_for_width(self, frame_width, max_width):
+        """Best level whose output is no wider than max_width."""
+        for level, (_, scale) in enumerate(self.levels):
+            if frame_width * scale <= max_width:
+                return level
+        return len(self.levels) - 1
+
+    def encode(self, frame, level=0):
+        """Returns frame as JPEG bytes at the given level."""
+        with self._locks[level]:
+            cached_frame, data = self._cache[level]
+            if cached_frame is frame:
+                self.stats["reused"] += 1
+                return data
+            start = time.perf_counter()
+            quality, scale = self.levels[level]
+            image = frame
+            if scale < 1.0:
+                height, width = int(frame.shape[0] * scale), int(frame.shape[1] * scale)
+                buffer = self._buffers[level]
+                if buffer is None or buffer.shape != (height, width) + frame.shape[2:]:
+                    buffer = self._buffers[level] = np.empty((height, width) + frame.shape[2:], dtype=frame.dtype)
+                image = cv2.resize(frame, (width, height), dst=buffer, interpolation=cv2.INTER_AREA)
+            _, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            data = encoded.tobytes()
+            self._cache[level] = (frame, data)
+            self.stats["encoded"] += 1
+            ENCODE_SECONDS.labels(level=level).observe(time.perf_counter() - start)
+            return data
+
+
+class AdaptiveQuality:
+    """Picks one client's level from the share of each frame interval spent blocked on sending.
+
+    A client whose sends take more than degrade_above of the time between
+    frames drops a level straight away; one that stays under upgrade_below
+    for upgrade_after frames moves back up. min_level caps the resolution,
+    e.g. for a small screen.
+    """
+
+    def __init__(self, num_levels, min_level=0, degrade_above=0.5, upgrade_below=0.15, upgrade_after=60, smoothing=0.2):
+        self.num_levels = num_levels
+        self.min_level = min_level
+        self.level = min_level
+        self.degrade_above = degrade_above
+        self.upgrade_below = upgrade_below
+        self.upgrade_after = upgrade_after
+        self.smoothing = smoothing
+        self.load = 0.0
+        self._calm_frames = 0
+
+    def record(self, send_seconds, interval):
+        """Updates the level after a frame took send_seconds to send; interval is the time between frames."""
+        if interval <= 0:
+            return self.level
+        self.load += self.smoothing * (min(send_seconds / interval, 2.0) - self.load)
+        if self.load > self.degrade_above and self.level < self.num_levels - 1:
+            self.level += 1
+            # Give the new level a fair start before judging it
+            self.load = (self.degrade_above + self.upgrade_below) / 2
+            self._calm_frames = 0
+        elif self.load < self.upgrade_below and self.level > self.min_level:
+            self._calm_frames += 1
+            if self._calm_frames >= self.upgrade_after:
+                self.level -= 1
+                self._calm_frames = 0
+        else:
+            self._calm_frames = 0
+        return self.level
@@ -0,0 +1,218 @@
+"""Declarative exercise rules and the engine that evaluates them.
+
+Each exercise declares, as data, the joint-angle checks that produce form
+feedback, the up/down transition used to count reps and, optionally, the
+ideal angle used for an accuracy score. RuleEngine compiles every
+registered exercise into index tables once, then per frame computes each
+needed angle a single time and evaluates all of an exercise's checks in one
+vectorized pass. Adding an exercise is a register_exercise() call and does
+not add branches to the frame loop.
+"""
+import collections
+
+import numpy as np
+
+from healthgenix.kinematics import JOINTS, JointAngleEngine
+
+# A condition compares one joint angle with a limit; a Check fires when all of
+# its conditions hold. Feedback is a list of groups of checks: within a group
+# only the first firing check reports, like an if/elif chain.
+Condition = collections.namedtuple("Condition", ["joint", "center", "use_abs", "sign", "limit"])
+Check = collections.namedtuple("Check", ["conditions", "message"])
+RepRule = collections.namedtuple("RepRule", ["joint", "down_below", "up_above"])
+AccuracyRule = collections.namedtuple("AccuracyRule", ["joint", "ideal"])
+Exercise = collections.namedtuple("Exercise", ["name", "feedback", "rep", "accuracy"])
+
+
+def above(joint, limit):
+    return Condition(joint, 0.0, False, 1.0, limit)
+
+
+def below(joint, limit):
+    return Condition(joint, 0.0, False, -1.0, limit)
+
+
+def deviates(joint, target, tolerance):
+    """True when the angle is more than tolerance degrees away from target."""
+    return Condition(joint, target, True, 1.0, tolerance)
+
+
+def check(message, *conditions):
+    return Check(tuple(conditions), message)
+
+
+EXERCISES = {}
+
+
+def register_exercise(name, feedback, rep=None, accuracy=None):
+    """Adds an exercise to the registry; engines built afterwards include it."""
+    EXERCISES[name] = Exercise(name, [list(group) for group in feedback], rep, accuracy)
+    return EXERCISES[name]
+
+
+def find_exercise(name):
+    """Looks an exercise up by name, ignoring case."""
+    if name in EXERCISES:
+        return EXERCISES[name]
+    for exercise in EXERCISES.values():
+        if exercise.name.lower() == str(name).lower():
+            return exercise
+    return None
+
+
+# Thresholds are strict so that feedback appears for anything short of perfect form
+register_exercise(
+    "Pull-Ups/Chin-Ups",
+    feedback=[
+        [check("Bend your elbows more!", above("left_elbow", 165)),
+         check("Don't over-bend your elbows!", below("left_elbow", 40))],
+        [check("Pull your shoulders down!", above("left_shoulder", 95))],
+        [check("Keep your body straight!", deviates("left_hip", 180, 5))],
+    ],
+    rep=RepRule("left_elbow", 60, 165),
+)
+
+register_exercise(
+    "Squat",
+    feedback=[
+        [check("Go deeper into your squat!", above("left_knee", 95)),
+         check("Don't squat too deep!", below("left_knee", 65))],
+        [check("Push your hips back more!", below("left_hip", 95))],
+        [check("Reduce forward lean!", above("left_ankle", 25))],
+    ],
+    rep=RepRule("left_knee", 95, 155),
+    accuracy=AccuracyRule("left_knee", 100),
+)
+
+register_exercise(
+    "Deadlift",
+    feedback=[
+        [check("Hinge more at the hips!", below("left_hip", 75)),
+         check("Stand up fully!", above("left_hip", 95), below("left_knee", 165))],
+        [check("Bend your knees less!", below("left_knee", 125))],
+        [check("Keep your spine neutral!", deviates("spine", 180, 5))],
+    ],
+    rep=RepRule("left_hip", 85, 165),
+)
+
+register_exercise(
+    "Bent-Over Rows",
+    feedback=[
+        [check("Maintain a 45-degree torso angle!", deviates("torso_lean", 45, 5))],
+        [check("Bend your elbows more!", above("left_elbow", 95))],
+        [check("Retract your shoulders!", below("left_shoulder", 35))],
+    ],
+    rep=RepRule("left_elbow", 95, 165),
+)
+
+register_exercise(
+    "Bicep Curls",
+    feedback=[
+        [check("Bend your elbows more!", above("left_elbow", 165)),
+         check("Don't over-bend your elbows!", below("left_elbow", 40))],
+        [check("Keep your wrists neutral!", deviates("left_wrist", 0, 5))],
+        [check("Stop swinging your torso!", deviates("torso_upright", 90, 3))],
+    ],
+    rep=RepRule("left_elbow", 60, 165),
+)
+
+
+class _CompiledExercise:
+    """Index tables for one exercise's checks over the engine's angle columns."""
+
+    def __init__(self, exercise, column):
+        conditions = []
+        check_conditions = []
+        self.messages = []
+        self.groups = []
+        for group in exercise.feedback:
+            start = len(self.messages)
+            for item in group:
+                check_conditions.append([len(conditions) + k for k in range(len(item.conditions))])
+                conditions.extend(item.conditions)
+                self.messages.append(item.message)
+            self.groups.append((start, len(self.messages)))
+
+        self.columns = np.array([column[c.joint] for c in conditions], dtype=np.intp)
+        self.center = np.array([c.center for c in conditions], dtype=np.float32)
+        self.use_abs = np.array([c.use_abs for c in conditions], dtype=bool)
+        self.sign = np.array([c.sign for c in conditions], dtype=np.float32)
+        self.limit = np.array([c.sign * c.limit for c in conditions], dtype=np.float32)
+        # Checks with fewer conditions are padded with an always-true slot
+        width = max((len(c) for c in check_conditions), default=1)
+        self.always = len(conditions)
+        self.check_index = np.array([c + [self.always] * (width - len(c)) for c in check_conditions], dtype=np.intp).reshape(-1, width)
+
+        self.rep = exercise.rep and (column[exercise.rep.joint], exercise.rep.down_below, exercise.rep.up_above)
+        self.accuracy = exercise.accuracy and (column[exercise.accuracy.joint], exercise.accuracy.ideal)
+
+
+class RuleEngine:
+    """Evaluates registered exercise rules against joint angles."""
+
+    def __init__(self, exercises=None):
+        exercises = list(EXERCISES.values()) if exercises is None else list(exercises)
+        needed = []
+        for exercise in exercises:
+            joints = [c.joint for group in exercise.feedback for item in group for c in item.conditions]
+            joints += [rule.joint for rule in (exercise.rep, exercise.accuracy) if rule]
+            needed.extend(j for j in joints if j not in needed)
+        self.angle_engine = JointAngleEngine({name: JOINTS[name] for name in needed})
+        self.angle_names = self.angle_engine.names
+        self._compiled = {e.name: _CompiledExercise(e, self.angle_engine.index) for e in exercises}
+
+    def _get(self, exercise):
+        compiled = self._compiled.get(exercise)
+        if compiled is None:
+            found = find_exercise(exercise)
+            compiled = self._compiled.get(found.name) if found else None
+        return compiled
+
+    def compute_angles(self, points):
+        """Angles shaped (..., len(angle_names)) for landmarks shaped (..., 33, D)."""
+        return self.angle_engine.compute(points)
+
+    def evaluate(self, exercise, angles):
+        """Boolean array (..., n_checks) of checks that report feedback; works on stacked frames."""
+        compiled = self._get(exercise)
+        if compiled is None or not compiled.messages:
+            return np.zeros(np.shape(angles)[:-1] + (0,), dtype=bool)
+        values = np.asarray(angles)[..., compiled.columns] - compiled.center
+        values = np.where(compiled.use_abs, np.abs(values), values)
+        holds = compiled.sign * values > compiled.limit
+        holds = np.concatenate([holds, np.ones(holds.shape[:-1] + (1,), dtype=bool)], axis=-1)
+        fired = holds[..., compiled.check_index].all(axis=-1)
+        # Keep only the first firing check of each group
+        for start, stop in compiled.groups:
+            if stop - start > 1:
+                earlier = np.logical_or.accumulate(fired[..., start:stop], axis=-1)
+                fired[..., start + 1:stop] &= ~earlier[..., :-1]
+        return fired
+
+    def feedback(self, exercise, angles):
+        """Feedback messages for a single frame of angles."""
+        compiled = self._get(exercise)
+        if compiled is None:
+            return []
+        return [compiled.messages[i] for i in np.flatnonzero(self.evaluate(exercise, angles))]
+
+    def update_rep_state(self, exercise, angles, state):
+        """Advances the up/down state machine; returns (state, rep_completed)."""
+        compiled = self._get(exercise)
+        if compiled is None or not compiled.rep:
+            return state, False
+        column, down_below, up_above = compiled.rep
+        angle = angles[column]
+        if angle < down_below and state == "up":
+            return "down", False
+        if angle > up_above and state == "down":
+            return "up", True
+        return state, False
+
+    def accuracy(self, exercise, angles):
+        """Form score 0-100 from the distance to the exercise's ideal angle, or 0 if it has none."""
+        compiled = self._get(exercise)
+        if compiled is None or not compiled.accuracy:
+            return 0
+        column, ideal = compiled.accuracy
+        return max(0, 100 - abs(float(angles[column]) - ideal))
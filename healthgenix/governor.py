@@ -0,0 +1,183 @@
+"""Adaptive pose quality: trades model complexity and input resolution for a target frame rate."""
+import collections
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from healthgenix.metrics import REGISTRY
+
+# (model_complexity, input scale), best first; MediaPipe's default Pose is (1, 1.0)
+LEVELS = ((2, 1.0), (1, 1.0), (1, 0.75), (0, 0.75), (0, 0.5))
+
+QUALITY_LEVEL = REGISTRY.gauge("pose_quality_level", "Current governor level (0 is the best quality).", ("governor",))
+QUALITY_SWITCHES = REGISTRY.counter("pose_quality_switches", "Governor level changes.", ("governor", "direction"))
+
+
+class PoseGovernor:
+    """Drop-in for a MediaPipe Pose that picks the model and input size to keep up with target_fps.
+
+    Every process() call is timed. When the smoothed inference time exceeds
+    the budget (headroom of the time per inference at target_fps, which is
+    frames_per_inference frame intervals when the scheduler skips frames) the
+    governor steps down a level straight away. After upgrade_after calls well
+    under budget it tries the level above; each time a level fails such a
+    probe, it waits twice as many calm calls before being tried again.
+
+    pose_factory(model_complexity) builds a Pose. The starting model is built
+    immediately; the others are built and warmed up on a background thread,
+    and a level is only used once its model is warm, so switching never
+    stalls a frame. Landmarks are normalized, so a downscaled input needs no
+    mapping back. Every switch is printed and kept in decisions.
+
+    With the default levels a governor ends up holding three models, about
+    three times the memory of a single Pose, and MediaPipe downloads the
+    heavy one at runtime; budget for that when creating many governors.
+    """
+
+    def __init__(self, pose_factory, target_fps=30, frames_per_inference=1, levels=LEVELS, start_level=1,
+                 headroom=0.8, smoothing=0.1, min_samples=10, upgrade_below=0.5, upgrade_after=90,
+                 max_upgrade_after=2400, name=None):
+        self.pose_factory = pose_factory
+        self.levels = levels
+        self.level = min(start_level, len(levels) - 1)
+        self.budget = headroom * frames_per_inference / target_fps
+        self.smoothing = smoothing
+        self.min_samples = min_samples
+        self.upgrade_below = upgrade_below
+        self.upgrade_after = upgrade_after
+        self.max_upgrade_after = max_upgrade_after
+        self.name = name or threading.current_thread().name
+        self.latency = None
+        self.decisions = collections.deque(maxlen=50)
+        self._samples = 0
+        self._calm = 0
+        self._probing = False
+        # Calm calls required before probing a level that failed before
+        self._probe_wait = {}
+        self._lock = threading.Lock()
+        # Reused while the input size stays the same (ROI crops change it often)
+        self._buffer = None
+        # Models by complexity, and those that have already run once
+        complexity = levels[self.level][0]
+        self._poses = {complexity: pose_factory(complexity)}
+        self._warm = set()
+        self._level_gauge = QUALITY_LEVEL.labels(governor=self.name)
+        self._level_gauge.set(self.level)
+        threading.Thread(target=self._prepare, name=f"{self.name}-models", daemon=True).start()
+
+    def _prepare(self):
+        blank = np.zeros((256, 256, 3), dtype=np.uint8)
+        for complexity in dict.fromkeys(complexity for complexity, _ in self.levels):
+            if complexity in self._poses:
+                continue
+            try:
+                pose = self.pose_factory(complexity)
+                pose.process(blank)
+            except Exception as e:
+                # e.g. the heavy model could not be downloaded; its levels are skipped
+                print(f"Pose governor {self.name}: model_complexity={complexity} unavailable: {e}")
+                continue
+            with self._lock:
+                self._poses[complexity] = pose
+                self._warm.add(complexity)
+
+    def _usable(self, level):
+        return self.levels[level][0] in self._warm
+
+    def _resize(self, image, scale):
+        height, width = int(image.shape[0] * scale), int(image.shape[1] * scale)
+        shape = (height, width) + image.shape[2:]
+        if self._buffer is None or self._buffer.shape != shape or self._buffer.dtype != image.dtype:
+            self._buffer = np.empty(shape, dtype=image.dtype)
+        return cv2.resize(image, (width, height), dst=self._buffer, interpolation=cv2.INTER_AREA)
+
+    def process(self, image):
+        complexity, scale = self.levels[self.level]
+        pose = self._poses[complexity]
+        if scale < 1.0:
+            image = self._resize(image, scale)
+        start = time.perf_counter()
+        results = pose.process(image)
+        elapsed = time.perf_counter() - start
+        if complexity in self._warm:
+            self._observe(elapsed)
+        else:
+            # The first call initializes the model graph and says nothing about steady-state speed
+            with self._lock:
+                self._warm.add(complexity)
+        return results
+
+    def _observe(self, seconds):
+        self.latency = seconds if self.latency is None else self.latency + self.smoothing * (seconds - self.latency)
+        self._samples += 1
+        if self._samples < self.min_samples:
+            return
+        if self._probing and self._samples >= self.upgrade_after:
+            # The probed level held up
+            self._probing = False
+            self._probe_wait.pop(self.level, None)
+
+        if self.latency > self.budget:
+            target = next((level for level in range(self.level + 1, len(self.levels)) if self._usable(level)), None)
+            if target is not None:
+                if self._probing:
+                    self._probe_wait[self.level] = min(2 * self._probe_wait.get(self.level, self.upgrade_after), self.max_upgrade_after)
+                self._switch(target, "over budget")
+        elif self.latency < self.upgrade_below * self.budget:
+            target = next((level for level in range(self.level - 1, -1, -1) if self._usable(level)), None)
+            if target is not None:
+                self._calm += 1
+                if self._calm >= self._probe_wait.get(target, self.upgrade_after):
+                    self._switch(target, "under budget", probing=True)
+        else:
+            self._calm = 0
+
+    def _switch(self, level, reason, probing=False):
+        decision = {
+            "time": time.time(),
+            "from": self.level,
+            "to": level,
+            "reason": reason,
+            "latency_ms": round(1000 * self.latency, 2),
+            "budget_ms": round(1000 * self.budget, 2),
+            "model_complexity": self.levels[level][0],
+            "scale": self.levels[level][1],
+        }
+        self.decisions.append(decision)
+        print(
+            f"Pose governor {self.name}: {reason} ({decision['latency_ms']} ms vs {decision['budget_ms']} ms), "
+            f"level {self.level} -> {level} (model_complexity={decision['model_complexity']}, scale={decision['scale']})"
+        )
+        QUALITY_SWITCHES.labels(governor=self.name, direction="down" if level > self.level else "up").inc()
+        self.level = level
+        self._level_gauge.set(level)
+        self.latency = None
+        self._samples = 0
+        self._calm = 0
+        self._probing = probing
+
+    def describe(self):
+        complexity, scale = self.levels[self.level]
+        with self._lock:
+            warm = sorted(self._warm)
+        return {
+            "name": self.name,
+            "level": self.level,
+            "model_complexity": complexity,
+            "scale": scale,
+            "latency_ms": None if self.latency is None else round(1000 * self.latency, 2),
+            "budget_ms": round(1000 * self.budget, 2),
+            "warm_models": warm,
+            "decisions": list(self.decisions),
+        }
+
+    def close(self):
+        with self._lock:
+            poses = list(self._poses.values())
+        for pose in poses:
+            pose.close()
+        QUALITY_LEVEL.remove(governor=self.name)
+        for direction in ("down", "up"):
+            QUALITY_SWITCHES.remove(governor=self.name, direction=direction)
@@ -0,0 +1,95 @@
+"""Vectorized joint-angle computation over MediaPipe Pose landmarks.
+
+Every function here accepts either a single frame of landmarks shaped
+``(33, D)`` or a stack of frames shaped ``(N, 33, D)`` (``D >= 2``; only x and
+y are used), so the same code serves the live loop and recorded sessions.
+"""
+import numpy as np
+
+NUM_LANDMARKS = 33
+
+# MediaPipe Pose landmark indices used by the exercise logic
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_ELBOW = 13
+RIGHT_ELBOW = 14
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+RIGHT_KNEE = 26
+LEFT_ANKLE = 27
+RIGHT_ANKLE = 28
+
+# Each joint is (first point, pivot, end point). A point is either a landmark
+# index or (landmark index, dx, dy) for a reference point offset from it,
+# e.g. a horizontal or vertical line through the pivot.
+JOINTS = {
+    "left_elbow": (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+    "right_elbow": (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+    "left_shoulder": (LEFT_ELBOW, LEFT_SHOULDER, LEFT_HIP),
+    "right_shoulder": (RIGHT_ELBOW, RIGHT_SHOULDER, RIGHT_HIP),
+    "left_hip": (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    "right_hip": (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE),
+    "left_knee": (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    "right_knee": (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE),
+    "left_ankle": (LEFT_KNEE, LEFT_ANKLE, (LEFT_ANKLE, 0.1, 0.0)),
+    "left_wrist": (LEFT_ELBOW, LEFT_WRIST, (LEFT_WRIST, 0.1, 0.0)),
+    "spine": (LEFT_SHOULDER, LEFT_HIP, RIGHT_HIP),
+    "torso_lean": (LEFT_HIP, LEFT_SHOULDER, (LEFT_SHOULDER, 0.0, 0.1)),
+    "torso_upright": (LEFT_SHOULDER, LEFT_HIP, (LEFT_HIP, 0.0, 0.1)),
+}
+
+
+def landmarks_to_array(landmarks):
+    """Converts a MediaPipe landmark list into a (33, 4) float32 array of x, y, z, visibility."""
+    return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks], dtype=np.float32)
+
+
+def calculate_angle(a, b, c):
+    """Angle at pivot b in degrees (0-180). Broadcasts over leading axes of a, b and c."""
+    a, b, c = np.asarray(a, dtype=np.float32), np.asarray(b, dtype=np.float32), np.asarray(c, dtype=np.float32)
+    radians = np.arctan2(c[..., 1] - b[..., 1], c[..., 0] - b[..., 0]) - np.arctan2(a[..., 1] - b[..., 1], a[..., 0] - b[..., 0])
+    angle = np.abs(np.degrees(radians))
+    return np.where(angle > 180.0, 360.0 - angle, angle)
+
+
+class JointAngleEngine:
+    """Computes a fixed set of joint angles in a single vectorized pass."""
+
+    def __init__(self, joints=None):
+        joints = JOINTS if joints is None else joints
+        self.names = tuple(joints)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        # Landmark index and offset for the three points of every joint
+        self._idx = np.zeros((3, len(self.names)), dtype=np.intp)
+        self._off = np.zeros((3, len(self.names), 2), dtype=np.float32)
+        for j, name in enumerate(self.names):
+            for slot, point in enumerate(joints[name]):
+                if isinstance(point, tuple):
+                    self._idx[slot, j] = point[0]
+                    self._off[slot, j] = point[1:]
+                else:
+                    self._idx[slot, j] = point
+
+    def compute(self, points):
+        """Returns angles shaped (..., J) for points shaped (..., 33, D), ordered as self.names."""
+        xy = np.asarray(points, dtype=np.float32)[..., :2]
+        a = xy[..., self._idx[0], :] + self._off[0]
+        b = xy[..., self._idx[1], :] + self._off[1]
+        c = xy[..., self._idx[2], :] + self._off[2]
+        return calculate_angle(a, b, c)
+
+    def compute_dict(self, points):
+        """Returns {joint name: angle} for a single frame."""
+        return dict(zip(self.names, self.compute(points).tolist()))
+
+
+# Default engine covering every joint the exercises use
+default_engine = JointAngleEngine()
+
+
+def joint_angles(points):
+    """Angles for all JOINTS as a dict (single frame) using the default engine."""
+    return default_engine.compute_dict(points)
@@ -0,0 +1,96 @@
+"""Compact, delta-encoded per-frame messages for clients that draw their own overlay.
+
+Each Snapshot becomes one JSON object with short keys:
+
+    v    snapshot version
+    t    timestamp in milliseconds
+    k    1 on keyframes, which carry absolute values and angle names ("an")
+    lm   33 landmarks flattened as [x, y, visibility, ...]; x and y in
+         1/10000 of the frame, visibility in percent. null when no pose.
+    a    joint angles in tenths of a degree, in the order of "an"
+    r, acc, st, ex, fb
+         reps, accuracy, stage, exercise and feedback list
+
+Between keyframes lm and a hold the difference from the previous message,
+and r, acc, st, ex and fb are only present when they changed. A client
+keeps the last decoded values and adds the deltas to them.
+"""
+import json
+
+import numpy as np
+
+COORD_SCALE = 10000
+VISIBILITY_SCALE = 100
+ANGLE_SCALE = 10
+
+# Message key for each scalar Snapshot field, sent only when it changes
+SCALAR_FIELDS = (("reps", "r"), ("accuracy", "acc"), ("stage", "st"), ("exercise", "ex"), ("feedback", "fb"))
+
+
+def quantize_landmarks(landmarks):
+    """Returns landmarks as a flat int32 array of (x, y, visibility), or None when there are none."""
+    if not len(landmarks):
+        return None
+    points = np.asarray(landmarks, dtype=np.float32)
+    scaled = np.empty((len(points), 3), dtype=np.float32)
+    scaled[:, :2] = points[:, :2] * COORD_SCALE
+    scaled[:, 2] = points[:, 3] * VISIBILITY_SCALE
+    return np.rint(scaled).astype(np.int32).ravel()
+
+
+class LandmarkDeltaEncoder:
+    """Encodes one client's stream of Snapshots; keeps the state its deltas refer to.
+
+    A keyframe is sent first, every keyframe_interval messages, and whenever
+    the pose or the set of angles reappears, so a client can join or recover
+    at any point.
+    """
+
+    def __init__(self, keyframe_interval=30):
+        self.keyframe_interval = keyframe_interval
+        self.reset()
+
+    def reset(self):
+        self._landmarks = None
+        self._angle_names = None
+        self._angles = None
+        self._scalars = {}
+        self._since_keyframe = 0
+
+    def encode(self, snapshot):
+        """Returns the message for snapshot as compact JSON bytes."""
+        landmarks = quantize_landmarks(snapshot.landmarks)
+        angle_names = tuple(snapshot.angles)
+        angles = np.rint(np.array(list(snapshot.angles.values()), dtype=np.float64) * ANGLE_SCALE).astype(np.int32)
+
+        keyframe = (
+            self._since_keyframe >= self.keyframe_interval
+            or (landmarks is not None and self._landmarks is None)
+            or angle_names != self._angle_names
+        )
+        message = {"v": snapshot.version, "t": int(snapshot.timestamp * 1000)}
+        if keyframe:
+            message["k"] = 1
+            message["an"] = angle_names
+            self._since_keyframe = 0
+            self._scalars = {}
+        self._since_keyframe += 1
+
+        if landmarks is None:
+            message["lm"] = None
+        elif keyframe:
+            message["lm"] = landmarks.tolist()
+        else:
+            message["lm"] = (landmarks - self._landmarks).tolist()
+        message["a"] = (angles if keyframe else angles - self._angles).tolist()
+        self._landmarks, self._angle_names, self._angles = landmarks, angle_names, angles
+
+        for field, key in SCALAR_FIELDS:
+            value = getattr(snapshot, field)
+            if field == "accuracy":
+                value = int(value)
+            elif field == "feedback":
+                value = list(value)
+            if key not in self._scalars or self._scalars[key] != value:
+                message[key] = self._scalars[key] = value
+        return json.dumps(message, separators=(",", ":")).encode()
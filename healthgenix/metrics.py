@@ -0,0 +1,311 @@
+"""Low-overhead metrics in the Prometheus text format, and a sampling profiler.
+
+Metric families are created once, usually at import time, on the module-level
+REGISTRY; creating a family that already exists returns it. Values that
+other objects already track (queue depths, cache counters) are exported by
+registering a collector callback instead of being copied on every change.
+"""
+import bisect
+import collections
+import contextlib
+import http.server
+import os
+import sys
+import threading
+import time
+
+# Seconds; from sub-millisecond frame stages up to slow model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        yield name + "_total", labels, self.value
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class Histogram:
+    """Counts observations into fixed buckets; observe() is a bisect and a locked increment."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextlib.contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            yield name + "_bucket", dict(labels, le="+Inf" if bound == float("inf") else repr(bound)), cumulative
+        yield name + "_sum", labels, total
+        yield name + "_count", labels, count
+
+
+class Family:
+    """A named metric with one child per combination of label values."""
+
+    def __init__(self, name, help_text, kind, factory, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._factory())
+        return child
+
+    def remove(self, **labels):
+        """Drops the child for these label values, e.g. when the object it describes goes away."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._children.pop(key, None)
+
+    # Families without labels can be used as their single child
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            for sample_name, labels, value in child.samples(self.name, dict(zip(self.labelnames, key))):
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._families = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name, help_text, kind, factory, labelnames):
+        with self._lock:
+            if name not in self._families:
+                self._families[name] = Family(name, help_text, kind, factory, labelnames)
+            return self._families[name]
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._family(name, help_text, "counter", Counter, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._family(name, help_text, "gauge", Gauge, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._family(name, help_text, "histogram", lambda: Histogram(buckets), labelnames)
+
+    def collector(self, key, func):
+        """Registers func() -> iterable of (name, kind, help, [(labels, value), ...]) under key, replacing any previous one."""
+        with self._lock:
+            self._collectors[key] = func
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            families = list(self._families.values())
+            collectors = list(self._collectors.values())
+        lines = []
+        for family in families:
+            lines.extend(family.render())
+        for collect in collectors:
+            for name, kind, help_text, samples in collect():
+                lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"])
+                suffix = "_total" if kind == "counter" else ""
+                for labels, value in samples:
+                    lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class RateMeter:
+    """Events per second over the last window seconds, e.g. output FPS."""
+
+    def __init__(self, window=5.0):
+        self.window = window
+        self._times = collections.deque()
+        self._lock = threading.Lock()
+
+    def mark(self):
+        now = time.monotonic()
+        with self._lock:
+            self._times.append(now)
+            while now - self._times[0] > self.window:
+                self._times.popleft()
+
+    def rate(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._times and now - self._times[0] > self.window:
+                self._times.popleft()
+            if len(self._times) < 2:
+                return 0.0
+            return (len(self._times) - 1) / max(now - self._times[0], 1e-9)
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack at a fixed interval while running.
+
+    Costs nothing while stopped. folded() returns "frame;frame;frame count"
+    lines, the input format of flamegraph tools.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = 0
+        self._stacks = collections.Counter()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        self._stacks = collections.Counter()
+        self.samples = 0
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def toggle(self, enabled, interval=None):
+        """Starts (clearing earlier samples) or stops profiling; returns the new state."""
+        if enabled and not self.running:
+            if interval:
+                self.interval = interval
+            self.reset()
+            self.start()
+        elif not enabled:
+            self.stop()
+        return {"running": self.running, "interval": self.interval, "samples": self.samples}
+
+
+PROFILER = SamplingProfiler()
+
+
+def start_http_server(port, registry=REGISTRY, profiler=PROFILER):
+    """Serves /metrics and /profiler on a background thread, for processes without a web app.
+
+    GET /profiler?enabled=1 (or 0) toggles the profiler; GET /profiler returns folded stacks.
+    """
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            path, _, query = self.path.partition("?")
+            if path == "/metrics":
+                body, content_type = registry.render(), CONTENT_TYPE
+            elif path == "/profiler":
+                params = dict(pair.partition("=")[::2] for pair in query.split("&") if pair)
+                if "enabled" in params:
+                    profiler.toggle(params["enabled"] not in ("0", "false"))
+                body, content_type = profiler.folded(), "text/plain; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
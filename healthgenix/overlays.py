@@ -0,0 +1,94 @@
+"""Correction images composited onto outgoing video frames."""
+import time
+
+import cv2
+
+
+class OverlayCache:
+    """Loads correction images once and keeps them pre-scaled for each frame size.
+
+    paths maps an overlay name to an image file. Images that cannot be read
+    are reported at load time and then simply never shown.
+    """
+
+    def __init__(self, paths, scale=0.4):
+        self.scale = scale
+        self._images = {}
+        self._scaled = {}
+        for name, path in paths.items():
+            image = cv2.imread(path)
+            if image is None:
+                print("Help image not found:", path)
+            else:
+                self._images[name] = image
+
+    def __contains__(self, name):
+        return name in self._images
+
+    def get(self, name, frame_shape):
+        """Returns the image for name scaled to fit scale of the frame, or None."""
+        key = (name, frame_shape[:2])
+        if key not in self._scaled:
+            image = self._images.get(name)
+            if image is not None:
+                height, width = frame_shape[:2]
+                factor = self.scale * min(width / image.shape[1], height / image.shape[0])
+                size = (max(1, int(image.shape[1] * factor)), max(1, int(image.shape[0] * factor)))
+                image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+            self._scaled[key] = image
+        return self._scaled[key]
+
+
+class CorrectionOverlay:
+    """Timed correction overlay driven by per-frame form state instead of sleeping.
+
+    update() is called once per frame with whether the form is poor. After
+    trigger_frames poor frames in a row the overlay is shown for duration
+    seconds, then stays off for at least cooldown seconds, so a run of bad
+    frames does not retrigger it continuously.
+    """
+
+    def __init__(self, cache, duration=5.0, trigger_frames=5, cooldown=10.0, alpha=0.85, margin=10):
+        self.cache = cache
+        self.duration = duration
+        self.trigger_frames = trigger_frames
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.margin = margin
+        self.name = None
+        self._poor_frames = 0
+        self._until = None
+        self._quiet_until = 0.0
+
+    @property
+    def active(self):
+        return self._until is not None
+
+    def update(self, name, poor, now=None):
+        """Advances the overlay state; returns "started", "ended" or None."""
+        now = time.monotonic() if now is None else now
+        if self._until is not None:
+            if now < self._until:
+                return None
+            self._until = None
+            self._quiet_until = now + self.cooldown
+            self._poor_frames = 0
+            return "ended"
+
+        self._poor_frames = self._poor_frames + 1 if poor else 0
+        if self._poor_frames >= self.trigger_frames and now >= self._quiet_until and name in self.cache:
+            self.name = name
+            self._until = now + self.duration
+            return "started"
+        return None
+
+    def draw(self, frame):
+        """Blends the active overlay into the top-right corner of frame in place."""
+        if self._until is None:
+            return frame
+        image = self.cache.get(self.name, frame.shape)
+        height, width = image.shape[:2]
+        x1 = frame.shape[1] - self.margin
+        roi = frame[self.margin:self.margin + height, x1 - width:x1]
+        roi[:] = cv2.addWeighted(image, self.alpha, roi, 1.0 - self.alpha, 0.0)
+        return frame
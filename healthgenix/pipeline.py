@@ -0,0 +1,175 @@
+"""Threaded frame pipeline with bounded, drop-oldest queues between stages."""
+import collections
+import queue
+import threading
+import time
+
+from healthgenix.metrics import REGISTRY, RateMeter
+
+STAGE_SECONDS = REGISTRY.histogram("pipeline_stage_seconds", "Time a pipeline stage spends on one item.", ("stage",))
+LATENCY_SECONDS = REGISTRY.histogram("pipeline_latency_seconds", "Time from capture to pipeline output.")
+
+# Marks the end of the stream; forwarded through every stage
+END = object()
+
+_Packet = collections.namedtuple("_Packet", ["value", "created"])
+
+
+class DropOldestQueue:
+    """Bounded queue that discards the oldest item instead of blocking the producer."""
+
+    def __init__(self, maxsize=2):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Returns the oldest item, raising queue.Empty if none arrives within timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                raise queue.Empty
+            return self._items.popleft()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class StageStats:
+    """Running timing totals for one stage."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total_time += seconds
+            self.last_time = seconds
+            self.max_time = max(self.max_time, seconds)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "count": self.count,
+                "avg_ms": round(1000 * self.total_time / self.count, 2) if self.count else 0.0,
+                "last_ms": round(1000 * self.last_time, 2),
+                "max_ms": round(1000 * self.max_time, 2),
+            }
+
+
+class Stage(threading.Thread):
+    """Worker that applies func to every item from inbox and puts the result on outbox.
+
+    A stage without an inbox is the source: func is called with no arguments
+    and returns the next item, or None once the stream has ended. Workers
+    returning None for an item skip it.
+    """
+
+    def __init__(self, name, func, inbox, outbox, stop_event):
+        super().__init__(name=f"pipeline-{name}", daemon=True)
+        self.stage_name = name
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stats = StageStats()
+        self._histogram = STAGE_SECONDS.labels(stage=name)
+        self._stop_event = stop_event
+
+    def run(self):
+        while not self._stop_event.is_set():
+            if self.inbox is None:
+                packet = None
+            else:
+                try:
+                    packet = self.inbox.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if packet is END:
+                    break
+
+            start = time.perf_counter()
+            value = self.func() if packet is None else self.func(packet.value)
+            elapsed = time.perf_counter() - start
+            self.stats.record(elapsed)
+            self._histogram.observe(elapsed)
+
+            if value is None:
+                if packet is None:
+                    break
+                continue
+            self.outbox.put(_Packet(value, start if packet is None else packet.created))
+        self.outbox.put(END)
+
+
+class FramePipeline:
+    """Runs a source and a chain of processing steps on separate threads.
+
+    Each step is a (name, func) pair. Queues between stages hold at most
+    queue_size items and drop the oldest when full, so a slow stage loses
+    stale frames rather than building up latency.
+    """
+
+    def __init__(self, source, *steps, queue_size=2):
+        self._stop_event = threading.Event()
+        self.stages = []
+        inbox = None
+        for name, func in (source,) + steps:
+            outbox = DropOldestQueue(queue_size)
+            self.stages.append(Stage(name, func, inbox, outbox, self._stop_event))
+            inbox = outbox
+        self.output = inbox
+        self.latency = StageStats()
+        self.fps = RateMeter()
+
+    @property
+    def running(self):
+        return any(stage.is_alive() for stage in self.stages)
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+    def frames(self):
+        """Yields pipeline outputs until the source ends or the pipeline is stopped."""
+        while not self._stop_event.is_set():
+            try:
+                packet = self.output.get(timeout=0.5)
+            except queue.Empty:
+                if not self.running:
+                    return
+                continue
+            if packet is END:
+                return
+            latency = time.perf_counter() - packet.created
+            self.latency.record(latency)
+            LATENCY_SECONDS.observe(latency)
+            self.fps.mark()
+            yield packet.value
+
+    def stats(self):
+        """Per-stage timings, queue depths and drop counts, plus end-to-end latency and output FPS."""
+        stages = {}
+        for stage in self.stages:
+            stages[stage.stage_name] = dict(
+                stage.stats.as_dict(),
+                queue_depth=len(stage.outbox),
+                dropped=stage.outbox.dropped,
+            )
+        return {"stages": stages, "end_to_end": self.latency.as_dict(), "fps": round(self.fps.rate(), 2)}
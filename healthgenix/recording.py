@@ -0,0 +1,71 @@
+"""Compact on-disk recordings of landmark streams.
+
+A recording is a single .npy file of structured records, one per frame:
+a float64 timestamp (seconds) and a float32 (33, 4) array of x, y, z,
+visibility. Frames without a detected pose are stored as NaN. Files are
+memory-mapped on read, so replaying a session never loads it whole.
+"""
+import os
+import shutil
+
+import numpy as np
+
+from healthgenix.kinematics import NUM_LANDMARKS
+
+RECORD_DTYPE = np.dtype([("timestamp", "<f8"), ("landmarks", "<f4", (NUM_LANDMARKS, 4))])
+
+
+class LandmarkRecorder:
+    """Appends frames to a recording as they arrive.
+
+    Records are streamed to a temporary file and the final .npy is written on
+    close, once the frame count for the header is known.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._part_path = path + ".part"
+        self._file = open(self._part_path, "wb")
+        self._record = np.zeros(1, dtype=RECORD_DTYPE)
+
+    def add(self, timestamp, points=None):
+        """Adds one frame; points is a (33, D) array or None when no pose was detected."""
+        self._record["timestamp"] = timestamp
+        if points is None:
+            self._record["landmarks"] = np.nan
+        else:
+            self._record["landmarks"][0, :, :] = np.nan
+            self._record["landmarks"][0, :, :points.shape[1]] = points[:, :4]
+        self._file.write(self._record.tobytes())
+        self.count += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        with open(self.path, "wb") as out, open(self._part_path, "rb") as body:
+            header = {"descr": np.lib.format.dtype_to_descr(RECORD_DTYPE), "fortran_order": False, "shape": (self.count,)}
+            np.lib.format.write_array_header_1_0(out, header)
+            shutil.copyfileobj(body, out)
+        os.remove(self._part_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def save_recording(path, timestamps, landmarks):
+    """Writes a whole session at once from arrays shaped (F,) and (F, 33, 4)."""
+    records = np.empty(len(timestamps), dtype=RECORD_DTYPE)
+    records["timestamp"] = timestamps
+    records["landmarks"] = landmarks
+    np.save(path, records)
+
+
+def load_recording(path):
+    """Returns memory-mapped (timestamps, landmarks) views shaped (F,) and (F, 33, 4)."""
+    records = np.load(path, mmap_mode="r")
+    return records["timestamp"], records["landmarks"]
@@ -0,0 +1,163 @@
+"""Workout results in an indexed SQLite database, written in the background."""
+import atexit
+import csv
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    reps INTEGER NOT NULL,
+    accuracy REAL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_user_exercise ON results (user, exercise, recorded_at);
+CREATE INDEX IF NOT EXISTS results_exercise ON results (exercise, recorded_at);
+"""
+
+# Columns of the CSV export, as read by server.js's Gym Analytics feed
+CSV_HEADER = ["Exercise", "Rep Count", "Timestamp"]
+
+# Marks the end of the write queue
+_CLOSE = object()
+
+
+class ResultsStore:
+    """Records workout results without blocking the caller and answers history queries.
+
+    record() only enqueues the row. A writer thread inserts queued rows in
+    one transaction every flush_interval seconds, or sooner once batch_size
+    rows are waiting, and drains the queue on close() or at interpreter
+    exit. The database runs in WAL mode so queries never wait for the writer.
+    Given a csv_path, the writer also appends each batch to that CSV file
+    (CSV_HEADER columns), for readers that predate the database.
+    """
+
+    def __init__(self, path, flush_interval=1.0, batch_size=256, csv_path=None):
+        self.path = path
+        self.csv_path = csv_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.written = 0
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._writer = threading.Thread(target=self._write, name="results-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    def record(self, exercise, reps, accuracy=None, user="local", timestamp=None):
+        """Queues one result; returns immediately."""
+        accuracy = None if accuracy is None else float(accuracy)
+        self._queue.put((user, exercise, int(reps), accuracy, time.time() if timestamp is None else timestamp))
+
+    def flush(self, timeout=None):
+        """Blocks until every result recorded so far has been written."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(_CLOSE)
+            self._writer.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self):
+        conn = self._connect()
+        closing = False
+        while not closing:
+            rows, events = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _CLOSE:
+                    closing = True
+                    break
+                if isinstance(item, threading.Event):
+                    events.append(item)
+                    break
+                rows.append(item)
+            if rows:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO results (user, exercise, reps, accuracy, recorded_at) VALUES (?, ?, ?, ?, ?)", rows
+                    )
+                self.written += len(rows)
+                if self.csv_path:
+                    self._export(rows)
+            for event in events:
+                event.set()
+        conn.close()
+
+    def _export(self, rows):
+        try:
+            new_file = not os.path.exists(self.csv_path)
+            with open(self.csv_path, "a", newline="") as file:
+                writer = csv.writer(file)
+                if new_file:
+                    writer.writerow(CSV_HEADER)
+                writer.writerows(
+                    (exercise, reps, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(recorded_at)))
+                    for _, exercise, reps, _, recorded_at in rows
+                )
+        except OSError as e:
+            # The database already has the rows; a failed export must not stop the writer
+            print(f"Could not append results to {self.csv_path}: {e}")
+
+    @staticmethod
+    def _filters(user, exercise, since, until):
+        clauses, params = [], []
+        for column, op, value in (("user", "=", user), ("exercise", "=", exercise), ("recorded_at", ">=", since), ("recorded_at", "<", until)):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def history(self, user=None, exercise=None, since=None, until=None, limit=100):
+        """Most recent results first, optionally filtered by user, exercise and time range."""
+        where, params = self._filters(user, exercise, since, until)
+        rows = self._reader().execute(
+            f"SELECT user, exercise, reps, accuracy, recorded_at FROM results{where} ORDER BY recorded_at DESC LIMIT ?",
+            params + [limit],
+        )
+        return [dict(row) for row in rows]
+
+    def aggregates(self, user=None, exercise=None, since=None, until=None):
+        """Per user and exercise: sets, total and best reps, mean accuracy, first and last time."""
+        where, params = self._filters(user, exercise, since, until)
+        rows = self._reader().execute(
+            "SELECT user, exercise, COUNT(*) AS sets, SUM(reps) AS total_reps, MAX(reps) AS best_reps,"
+            " AVG(accuracy) AS avg_accuracy, MIN(recorded_at) AS first, MAX(recorded_at) AS last"
+            f" FROM results{where} GROUP BY user, exercise ORDER BY user, exercise",
+            params,
+        )
+        return [dict(row) for row in rows]
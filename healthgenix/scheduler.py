@@ -0,0 +1,123 @@
+"""Inference scheduling: region-of-interest cropping and frame skipping for pose models."""
+import collections
+
+import numpy as np
+
+# Landmarks whose visibility decides whether a result can be trusted
+BODY_LANDMARKS = [11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28]
+
+PoseResult = collections.namedtuple("PoseResult", ["pose_landmarks", "points", "inferred"])
+
+
+class InferenceScheduler:
+    """Wraps a MediaPipe Pose and decides how each frame is processed.
+
+    When the previous frame had a confident pose, the model only sees a
+    padded crop around it. With every > 1 the model runs on every k-th frame
+    and the frames in between are predicted from the velocity of the last
+    two inferred poses. A low-confidence result falls back to a full-frame
+    pass, and the next frame is always inferred.
+
+    process() returns a PoseResult whose pose_landmarks is a normalized
+    landmark list for the full frame, usable with mp_drawing.draw_landmarks.
+    Build the Pose with static_image_mode=True: crops move between frames,
+    so MediaPipe's own tracking and smoothing would blend unrelated regions.
+    With crop=False the model always gets the full frame; use that with a
+    tracking-mode Pose, which crops around the previous landmarks itself.
+    """
+
+    def __init__(self, pose, every=1, roi_padding=0.3, min_visibility=0.5, max_roi_fraction=0.8, crop=True):
+        self.pose = pose
+        self.every = max(1, int(every))
+        self.crop = crop
+        self.roi_padding = roi_padding
+        self.min_visibility = min_visibility
+        self.max_roi_fraction = max_roi_fraction
+        self.stats = collections.Counter()
+        self.reset()
+
+    def reset(self):
+        self._landmarks = None
+        self._points = None
+        self._velocity = None
+        self._since_inference = 0
+
+    def _confident(self, points):
+        return points is not None and points[BODY_LANDMARKS, 3].mean() >= self.min_visibility
+
+    def _roi(self, width, height):
+        """Padded bounding box (x0, y0, x1, y1) in pixels around the last pose, or None for full frame."""
+        visible = self._points[self._points[:, 3] >= self.min_visibility, :2]
+        if len(visible) < 2:
+            return None
+        (x0, y0), (x1, y1) = visible.min(axis=0), visible.max(axis=0)
+        pad = self.roi_padding * max(x1 - x0, y1 - y0)
+        x0, x1 = int(max(0.0, x0 - pad) * width), int(min(1.0, x1 + pad) * width)
+        y0, y1 = int(max(0.0, y0 - pad) * height), int(min(1.0, y1 + pad) * height)
+        if x1 - x0 < 32 or y1 - y0 < 32 or (x1 - x0) * (y1 - y0) > self.max_roi_fraction * width * height:
+            return None
+        return x0, y0, x1, y1
+
+    def _infer(self, image, roi, pose):
+        height, width = image.shape[:2]
+        if roi is None:
+            results = pose.process(image)
+            self.stats["full_frame"] += 1
+        else:
+            x0, y0, x1, y1 = roi
+            results = pose.process(np.ascontiguousarray(image[y0:y1, x0:x1]))
+            self.stats["roi"] += 1
+        if not results.pose_landmarks:
+            return None, None
+
+        landmarks = results.pose_landmarks
+        points = np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks.landmark], dtype=np.float32)
+        if roi is not None:
+            # Map crop-normalized coordinates back to the full frame
+            scale_x, scale_y = (x1 - x0) / width, (y1 - y0) / height
+            points[:, 0] = points[:, 0] * scale_x + x0 / width
+            points[:, 1] = points[:, 1] * scale_y + y0 / height
+            points[:, 2] *= scale_x
+            self._write(landmarks, points)
+        return landmarks, points
+
+    @staticmethod
+    def _write(landmarks, points):
+        for lm, (x, y, z) in zip(landmarks.landmark, points[:, :3].tolist()):
+            lm.x, lm.y, lm.z = x, y, z
+
+    def process(self, image, pose=None):
+        """Returns the pose for an RGB frame, inferring or predicting as scheduled.
+
+        pose overrides the wrapped model for this call, for schedulers whose
+        frames are spread over a pool of Pose instances.
+        """
+        if self._points is not None and self._since_inference + 1 < self.every:
+            # Predict this frame from the last inferred pose and its velocity
+            self._since_inference += 1
+            self.stats["predicted"] += 1
+            points = self._points.copy()
+            if self._velocity is not None:
+                points[:, :3] += self._velocity * self._since_inference
+            landmarks = type(self._landmarks)()
+            landmarks.CopyFrom(self._landmarks)
+            self._write(landmarks, points)
+            return PoseResult(landmarks, points, False)
+
+        height, width = image.shape[:2]
+        roi = self._roi(width, height) if self.crop and self._points is not None else None
+        pose = self.pose if pose is None else pose
+        landmarks, points = self._infer(image, roi, pose)
+        if roi is not None and not self._confident(points):
+            self.stats["fallback"] += 1
+            landmarks, points = self._infer(image, None, pose)
+
+        if self._confident(points):
+            steps = self._since_inference + 1
+            self._velocity = None if self._points is None else (points[:, :3] - self._points[:, :3]) / steps
+            self._landmarks, self._points = landmarks, points
+        else:
+            # Nothing trustworthy to crop around or predict from
+            self.reset()
+        self._since_inference = 0
+        return PoseResult(landmarks, points, True)
@@ -0,0 +1,255 @@
+"""Session-scoped pose analysis on a shared pool of Pose workers."""
+import collections
+import concurrent.futures
+import os
+import threading
+import time
+import uuid
+
+from healthgenix.scheduler import InferenceScheduler
+from healthgenix.snapshot import SnapshotStore
+
+
+class PoseSession:
+    """State for one trainee: exercise, rep state machine, inference schedule and latest result."""
+
+    def __init__(self, session_id, exercise, every=1, announce=False, persistent=False, user="local", crop=True):
+        self.id = session_id
+        self.user = user
+        self.exercise = exercise
+        self.rep_count = 0
+        # Sum of the accuracy at which each rep was counted
+        self.rep_accuracy = 0.0
+        self.stage = None
+        # Only the session in front of the server's own camera speaks out loud
+        self.announce = announce
+        self.persistent = persistent
+        self.scheduler = InferenceScheduler(None, every=every, crop=crop)
+        self.results = SnapshotStore()
+        self.last_active = time.time()
+        self.lock = threading.Lock()
+        # The session's own Pose, built on its worker for its first frame
+        self.pose = None
+        self.closed = False
+        self._worker = None
+        self._pending = None
+        self._queued = False
+
+    def set_exercise(self, exercise):
+        with self.lock:
+            self.exercise = exercise
+            self.rep_count = 0
+            self.rep_accuracy = 0.0
+            self.stage = None
+            self.scheduler.reset()
+
+
+class PoseService:
+    """Schedules frames from every session onto a fixed pool of Pose workers.
+
+    A session is pinned to the worker with the fewest sessions when it is
+    created, and has its own Pose, built by pose_factory on that worker for
+    its first frame. A Pose therefore only ever sees one session's frames
+    and may keep tracking state between calls (static_image_mode=False). It
+    is closed with the session. A session keeps at most one pending frame
+    (a newer frame supersedes it), and each worker serves its sessions with
+    work in round-robin order, so a busy client cannot starve the others.
+
+    process_frame(session, pose, frame) runs on a worker; its return value
+    resolves the Future returned by submit(). Superseded frames resolve to None.
+
+    Workers start on start() or the first submit(). Each builds one Pose and,
+    given a warmup_frame (RGB), runs one inference on it before taking work;
+    ready is true once every worker has done so. That warm Pose goes to the
+    first session on the worker, usually the one created at startup.
+
+    Sessions that send no frame for max_idle seconds are closed by sweep(),
+    which also runs periodically once the workers have started. on_close(session)
+    runs for every session closed by close_session() or sweep(), e.g. to save
+    its results.
+    """
+
+    def __init__(self, pose_factory, process_frame, workers=None, max_idle=600, warmup_frame=None, on_close=None):
+        self.pose_factory = pose_factory
+        self.process_frame = process_frame
+        self.max_idle = max_idle
+        self.on_close = on_close
+        self.warmup_frame = warmup_frame
+        self.stats = collections.Counter()
+        self.errors = []
+        self._sessions = {}
+        self._cond = threading.Condition()
+        self._warm = 0
+        self._started = False
+        count = workers or os.cpu_count() or 1
+        # Per worker: sessions with a pending frame, its wake-up condition, pinned sessions and warm Pose
+        self._queues = [collections.deque() for _ in range(count)]
+        self._wakeups = [threading.Condition(self._cond) for _ in range(count)]
+        self._load = [0] * count
+        self._spares = [None] * count
+        self._workers = [
+            threading.Thread(target=self._work, args=(i,), name=f"pose-worker-{i}", daemon=True)
+            for i in range(count)
+        ]
+
+    def start(self):
+        with self._cond:
+            if self._started:
+                return self
+            self._started = True
+        for worker in self._workers:
+            worker.start()
+        threading.Thread(target=self._sweep_periodically, name="pose-sweeper", daemon=True).start()
+        return self
+
+    def _sweep_periodically(self):
+        # Clients often just stop sending frames; close their sessions even if no new one is created
+        while True:
+            time.sleep(min(60, self.max_idle))
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Pose session sweep failed: {e}")
+
+    @property
+    def ready(self):
+        return self._warm == len(self._workers)
+
+    def wait_ready(self, timeout=None):
+        """Starts the workers and blocks until all are warm; returns ready."""
+        self.start()
+        with self._cond:
+            return self._cond.wait_for(lambda: self.ready or self.errors, timeout) and self.ready
+
+    def create_session(self, exercise, session_id=None, **kwargs):
+        self.sweep()
+        session = PoseSession(session_id or uuid.uuid4().hex, exercise, **kwargs)
+        with self._cond:
+            session._worker = min(range(len(self._workers)), key=self._load.__getitem__)
+            self._load[session._worker] += 1
+            self._sessions[session.id] = session
+        return session
+
+    def get_session(self, session_id):
+        return self._sessions.get(session_id)
+
+    def sessions(self):
+        with self._cond:
+            return list(self._sessions.values())
+
+    def close_session(self, session_id):
+        with self._cond:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._detach(session)
+        if session is not None:
+            self._finish(session)
+        return session is not None
+
+    def sweep(self):
+        """Closes sessions that have not sent a frame for max_idle seconds."""
+        cutoff = time.time() - self.max_idle
+        expired = []
+        with self._cond:
+            for session_id, session in list(self._sessions.items()):
+                if not session.persistent and session.last_active < cutoff:
+                    del self._sessions[session_id]
+                    self._detach(session)
+                    expired.append(session)
+                    self.stats["expired"] += 1
+        for session in expired:
+            self._finish(session)
+
+    def _detach(self, session):
+        # Called with self._cond held, once the session is out of self._sessions
+        session.closed = True
+        self._load[session._worker] -= 1
+        if session._pending is not None:
+            session._pending[1].set_result(None)
+            session._pending = None
+
+    def _finish(self, session):
+        # Waits for a frame in progress; the worker checks closed before building a Pose
+        with session.lock:
+            pose, session.pose = session.pose, None
+        if pose is not None:
+            pose.close()
+        if self.on_close is not None:
+            self.on_close(session)
+
+    def submit(self, session_id, frame):
+        """Queues a BGR frame for a session and returns a Future for its result."""
+        if not self._started:
+            self.start()
+        session = self._sessions[session_id]
+        future = concurrent.futures.Future()
+        with self._cond:
+            session.last_active = time.time()
+            if session._pending is not None:
+                session._pending[1].set_result(None)
+                self.stats["superseded"] += 1
+            session._pending = (frame, future)
+            if not session._queued:
+                session._queued = True
+                self._queues[session._worker].append(session)
+                self._wakeups[session._worker].notify()
+        return future
+
+    def _work(self, index):
+        try:
+            pose = self.pose_factory()
+            if self.warmup_frame is not None:
+                # The first inference initializes the model graph; pay for it before real frames arrive
+                pose.process(self.warmup_frame)
+        except Exception as e:
+            with self._cond:
+                self.errors.append(f"{type(e).__name__}: {e}")
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._spares[index] = pose
+            self._warm += 1
+            self._cond.notify_all()
+
+        queue, wakeup = self._queues[index], self._wakeups[index]
+        while True:
+            with self._cond:
+                wakeup.wait_for(lambda: queue)
+                session = queue.popleft()
+                if session._pending is None:
+                    # Closed while it waited
+                    session._queued = False
+                    continue
+                frame, future = session._pending
+                session._pending = None
+            try:
+                with session.lock:
+                    if session.closed:
+                        result = None
+                    else:
+                        if session.pose is None:
+                            session.pose = self._spares[index] or self.pose_factory()
+                            self._spares[index] = None
+                        result = self.process_frame(session, session.pose, frame)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            with self._cond:
+                self.stats["processed"] += 1
+                # Back of this worker's line if another frame arrived meanwhile
+                if session._pending is not None:
+                    queue.append(session)
+                else:
+                    session._queued = False
+
+    def describe(self):
+        with self._cond:
+            return {
+                "workers": len(self._workers),
+                "warm_workers": self._warm,
+                "sessions": len(self._sessions),
+                "sessions_per_worker": list(self._load),
+                "queued": sum(len(queue) for queue in self._queues),
+                **self.stats,
+            }
@@ -0,0 +1,41 @@
+"""Streaming Savitzky-Golay smoothing of pose landmarks."""
+import numpy as np
+from scipy.signal import savgol_coeffs
+
+from healthgenix.kinematics import NUM_LANDMARKS
+
+
+class KeypointSmoother:
+    """Smooths x and y of every landmark over a fixed-size ring buffer.
+
+    Each update costs the same regardless of session length: the newest
+    frame overwrites the oldest slot and the smoothed frame is a single dot
+    product with precomputed filter coefficients. The result matches
+    ``savgol_filter(history, window_length, polyorder, axis=0)[-1]``.
+    """
+
+    def __init__(self, window_length=5, polyorder=2, num_landmarks=NUM_LANDMARKS):
+        self.window_length = window_length
+        self._buffer = np.zeros((window_length, num_landmarks, 2), dtype=np.float32)
+        # Coefficients that evaluate the fitted polynomial at the newest sample,
+        # pre-rotated for every ring position so no reordering is needed
+        coeffs = savgol_coeffs(window_length, polyorder, pos=window_length - 1, use="dot").astype(np.float32)
+        self._coeffs = np.stack([np.roll(coeffs, head + 1) for head in range(window_length)])
+        self.reset()
+
+    def reset(self):
+        """Forgets all buffered frames, e.g. when switching exercises."""
+        self._head = -1
+        self._count = 0
+
+    def update(self, points):
+        """Adds a (33, D) frame and returns a copy with smoothed x and y."""
+        self._head = (self._head + 1) % self.window_length
+        self._buffer[self._head] = points[:, :2]
+        self._count = min(self._count + 1, self.window_length)
+
+        smoothed = np.array(points, dtype=np.float32)
+        if self._count == self.window_length:
+            # Not enough history yet otherwise; the raw frame is returned as-is
+            smoothed[:, :2] = np.tensordot(self._coeffs[self._head], self._buffer, axes=1)
+        return smoothed
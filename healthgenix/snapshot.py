@@ -0,0 +1,39 @@
+"""Immutable, versioned snapshots of the latest analysis result."""
+import collections
+import threading
+import time
+import types
+
+Snapshot = collections.namedtuple(
+    "Snapshot",
+    ["version", "timestamp", "exercise", "reps", "accuracy", "stage", "feedback", "landmarks", "angles"],
+)
+
+
+class SnapshotStore:
+    """Holds the most recent Snapshot published by the streaming loop.
+
+    Readers get the snapshot object itself; it is a tuple and never mutated
+    (angles is a read-only mapping), so no copy or lock is needed to use it.
+    wait_newer() supports long-polling.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._latest = Snapshot(0, time.time(), None, 0, 0.0, None, (), (), types.MappingProxyType({}))
+
+    @property
+    def latest(self):
+        return self._latest
+
+    def publish(self, **fields):
+        with self._cond:
+            self._latest = self._latest._replace(version=self._latest.version + 1, timestamp=time.time(), **fields)
+            self._cond.notify_all()
+            return self._latest
+
+    def wait_newer(self, version, timeout):
+        """Blocks until a snapshot newer than version exists or timeout expires, then returns the latest."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._latest.version > version, timeout)
+            return self._latest
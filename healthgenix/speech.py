@@ -0,0 +1,218 @@
+"""Non-blocking text-to-speech: live announcements and background rendering to audio files."""
+import collections
+import concurrent.futures
+import hashlib
+import heapq
+import itertools
+import os
+import queue
+import re
+import threading
+import time
+
+from healthgenix.metrics import REGISTRY
+
+TTS_SECONDS = REGISTRY.histogram("tts_seconds", "Time to speak an announcement or render an audio file.", ("kind",))
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class SpeechQueue:
+    """Speaks queued announcements on a dedicated pyttsx3 worker thread.
+
+    say() only enqueues and returns immediately. Lower priority numbers are
+    spoken first. Announcements sharing a key coalesce: a newer one replaces
+    any pending one, so "Count 3" is skipped when "Count 4" is already queued.
+    The engine starts with the first say(), or ahead of it with start().
+    """
+
+    def __init__(self, rate=None, volume=None):
+        self.rate = rate
+        self.volume = volume
+        self.skipped = 0
+        self._heap = []
+        self._pending = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def say(self, text, priority=PRIORITY_NORMAL, key=None):
+        with self._cond:
+            if key is not None and key in self._pending:
+                # Lazily drop the stale entry when it reaches the top of the heap
+                self._pending[key][3] = None
+                self.skipped += 1
+            entry = [priority, next(self._seq), key, text]
+            if key is not None:
+                self._pending[key] = entry
+            heapq.heappush(self._heap, entry)
+            self._cond.notify()
+        self.start()
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="speech", daemon=True)
+                self._thread.start()
+        return self
+
+    def __len__(self):
+        with self._cond:
+            return sum(1 for entry in self._heap if entry[3] is not None)
+
+    def _next(self):
+        with self._cond:
+            while True:
+                self._cond.wait_for(lambda: self._heap)
+                _, _, key, text = heapq.heappop(self._heap)
+                if text is None:
+                    continue
+                if key is not None:
+                    del self._pending[key]
+                return text
+
+    def _run(self):
+        import pyttsx3
+
+        # The engine lives on this thread only; pyttsx3 drivers are not thread-safe
+        engine = pyttsx3.init()
+        if self.rate is not None:
+            engine.setProperty('rate', self.rate)
+        if self.volume is not None:
+            engine.setProperty('volume', self.volume)
+        timer = TTS_SECONDS.labels(kind="speak")
+        while True:
+            engine.say(self._next())
+            with timer.time():
+                engine.runAndWait()
+
+
+class AudioFilePool:
+    """Renders text to audio files on a pool of long-lived pyttsx3 engines.
+
+    Each worker thread initializes one engine and picks its voice once. Files
+    are named by a hash of the text and voice settings, so text that was
+    spoken before is not synthesized again. submit() returns the file name
+    immediately; future() gives a Future resolving to the file's path once it
+    has been written. Workers start as jobs arrive, or all at once with start().
+
+    Keep workers at 1 unless the speech driver keeps its state per engine
+    (SAPI5 on Windows, NSSpeechSynthesizer on macOS). The espeak driver on
+    Linux registers one process-wide synthesis callback, so a second engine
+    takes over the first one's output.
+    """
+
+    def __init__(self, directory, workers=1, rate=None, volume=None, voices=(), prefix="audio_", extension=".mp3"):
+        self.directory = directory
+        self.workers = workers
+        self.rate = rate
+        self.volume = volume
+        # Substrings of preferred voice names, e.g. ("female", "zira")
+        self.voices = tuple(voice.lower() for voice in voices)
+        self.prefix = prefix
+        self.extension = extension
+        self.stats = collections.Counter()
+        self._name_pattern = re.compile(re.escape(prefix) + r"[0-9a-f]{32}" + re.escape(extension))
+        self._pending = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def file_name(self, text):
+        settings = f"{self.voices}|{self.rate}|{self.volume}|{text}"
+        return f"{self.prefix}{hashlib.sha256(settings.encode()).hexdigest()[:32]}{self.extension}"
+
+    def submit(self, text):
+        """Queues text for synthesis unless its file exists or is on the way; returns the file name."""
+        name = self.file_name(text)
+        with self._lock:
+            if name in self._pending:
+                self.stats["joined"] += 1
+            elif os.path.exists(os.path.join(self.directory, name)):
+                self.stats["reused"] += 1
+            else:
+                future = self._pending[name] = concurrent.futures.Future()
+                self._queue.put((name, text, future))
+                self.stats["queued"] += 1
+                self._add_worker()
+        return name
+
+    def _add_worker(self):
+        # Called with self._lock held
+        if len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"tts-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def start(self):
+        """Starts every worker, so their engines are initialized before the first job."""
+        with self._lock:
+            while len(self._threads) < self.workers:
+                self._add_worker()
+        return self
+
+    def future(self, name):
+        """Future for the path of a submitted file, or None for names this pool never produced."""
+        if not self._name_pattern.fullmatch(name):
+            return None
+        with self._lock:
+            future = self._pending.get(name)
+        if future is not None:
+            return future
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            return None
+        future = concurrent.futures.Future()
+        future.set_result(path)
+        return future
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _engine(self):
+        import pyttsx3
+
+        # pyttsx3.init() hands every thread the same cached engine; each worker needs its own
+        engine = pyttsx3.Engine()
+        for voice in engine.getProperty('voices'):
+            if any(hint in voice.name.lower() for hint in self.voices):
+                engine.setProperty('voice', voice.id)
+                break
+        if self.rate is not None:
+            engine.setProperty('rate', self.rate)
+        if self.volume is not None:
+            engine.setProperty('volume', self.volume)
+        return engine
+
+    def _run(self):
+        try:
+            engine, error = self._engine(), None
+        except Exception as e:
+            # No speech driver on this host: fail every job instead of leaving it pending
+            engine, error = None, e
+
+        timer = TTS_SECONDS.labels(kind="file")
+        while True:
+            name, text, future = self._queue.get()
+            path = os.path.join(self.directory, name)
+            # Written under a temporary name so a half-written file is never served
+            partial = os.path.join(self.directory, f".{name}.partial{self.extension}")
+            try:
+                if engine is None:
+                    raise RuntimeError(f"Speech engine unavailable: {error}")
+                start = time.perf_counter()
+                engine.save_to_file(text, partial)
+                engine.runAndWait()
+                os.replace(partial, path)
+                timer.observe(time.perf_counter() - start)
+            except Exception as e:
+                future.set_exception(e)
+                self.stats["failed"] += 1
+            else:
+                future.set_result(path)
+                self.stats["synthesized"] += 1
+            with self._lock:
+                del self._pending[name]